@@ -1 +1,2 @@
-from orgformat.orgformat import OrgFormat, TimestampParseException
+from orgformat.orgformat import OrgFormat, TimestampParseException, PropertyDrawer, \
+    OrgFormatProfiler, FunctionStatistics, ExtractedDatetime, HeadingRenderCache, TimestampFormatter
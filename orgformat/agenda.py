@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# Find much more example calls in the unit test file agenda_test.py
+# -*- coding: utf-8; mode: python; -*-
+
+import bisect
+import calendar
+import datetime
+import re
+import threading
+from typing import List, Tuple, Optional, Iterable, Dict, NamedTuple  # mypy: type checks
+
+from orgformat.orgformat import HEADING_REGEX, heading_title_regex
+
+
+class AgendaEntry(NamedTuple):
+    """
+    One occurrence of a SCHEDULED or DEADLINE time-stamp of a heading.
+    Repeating time-stamps result in one entry per occurrence.
+    """
+
+    filename: str
+    offset: int  # character offset of the heading line within the file
+    level: int
+    keyword: Optional[str]
+    priority: Optional[str]
+    title: str
+    tags: Tuple[str, ...]
+    planning: str  # 'SCHEDULED' or 'DEADLINE'
+    timestamp: str  # the time-stamp as written in the file
+    date: datetime.date  # date of this occurrence
+    time: Optional[datetime.time]
+    repeated: bool  # True for occurrences generated from a repeater
+
+
+class Agenda(object):
+    """
+    Index of the SCHEDULED and DEADLINE time-stamps of the headings of
+    Org mode files which answers agenda queries for days, weeks and
+    overdue entries.
+
+    agenda = Agenda(['~/org/work.org', '~/org/private.org'])
+    agenda.day(datetime.date(2019, 12, 29))
+    -> [AgendaEntry(filename='~/org/work.org', ..., title='This is my title', planning='SCHEDULED', ...)]
+
+    The entries are kept in one bucket per day so that a query only
+    touches the days asked for. Repeaters such as '+1w', '++1d' or
+    '.+1m' are expanded into one entry per occurrence up to expand_until.
+    Monthly and yearly repeaters on days that do not exist in a month
+    fall on the last day of that month. Hourly repeaters are not
+    expanded.
+
+    Once all files are added, one Agenda can serve many threads:
+    queries do not modify the index except for the sorted index of
+    overdue() which is built once, guarded by a lock.
+
+    @param filenames: optional Org mode files to add right away
+    @param todo_keywords: keywords recognized at the beginning of heading titles
+    @param done_keywords: keywords of finished headings; not reported as overdue
+    @param expand_until: last day repeaters are expanded to; default is one year from today
+    """
+
+    PLANNING_REGEX = re.compile(r'(SCHEDULED|DEADLINE):[ \t]*(<[^>\n]+>)')
+
+    TIMESTAMP_REGEX = re.compile(r'<(\d{4})-(\d\d)-(\d\d)' +
+                                 r'(?: [^\d\s>+.-]+)?' +
+                                 r'(?: (\d{1,2}):(\d\d)(?:-\d{1,2}:\d\d)?)?' +
+                                 r'(?: ([.+]?\+)(\d+)([hdwmy]))?')
+
+    def __init__(self,
+                 filenames: Optional[Iterable[str]] = None,
+                 todo_keywords: Tuple[str, ...] = ('TODO', 'NEXT', 'WAITING', 'DONE', 'CANCELED'),
+                 done_keywords: Tuple[str, ...] = ('DONE', 'CANCELED'),
+                 expand_until: Optional[datetime.date] = None) -> None:
+        self.done_keywords = frozenset(done_keywords)
+        self.expand_until = expand_until or datetime.date.today() + datetime.timedelta(days=365)
+        self._title_regex = heading_title_regex(todo_keywords)
+        # date ordinal -> entries of that day
+        self._days: Dict[int, List[AgendaEntry]] = {}
+        # not expanded entries which are not done:
+        self._open_entries: List[AgendaEntry] = []
+        # the same sorted by date plus their date ordinals; built on demand:
+        self._overdue_index: Optional[Tuple[List[int], List[AgendaEntry]]] = None
+        self._overdue_index_lock = threading.Lock()
+        if filenames:
+            for filename in filenames:
+                self.add_file(filename)
+
+    def add_file(self, filename: str, encoding: str = 'utf-8') -> None:
+        """
+        Adds the headings of an Org mode file to the index.
+        """
+
+        with open(filename, encoding=encoding) as orgfile:
+            self.add_text(orgfile.read(), filename)
+
+    def add_text(self, text: str, filename: str = '') -> None:
+        """
+        Adds the headings of Org mode text to the index. Only the
+        planning line directly below a heading is considered, as in
+        Org mode.
+
+        @param text: content of an Org mode file
+        @param filename: name reported in the AgendaEntry objects
+        """
+
+        offset = 0
+        heading: Optional[re.Match[str]] = None
+        heading_offset = 0
+        for line in text.splitlines(keepends=True):
+            if line.startswith('*'):
+                heading = HEADING_REGEX.match(line.rstrip('\r\n'))
+                heading_offset = offset
+            elif heading:
+                if 'SCHEDULED:' in line or 'DEADLINE:' in line:
+                    for planning in Agenda.PLANNING_REGEX.finditer(line):
+                        self._add_timestamp(filename, heading_offset, heading,
+                                            planning.group(1), planning.group(2))
+                heading = None
+            offset += len(line)
+
+    def day(self, date: datetime.date) -> List[AgendaEntry]:
+        """
+        Returns the entries of the given day; timed ones first.
+        """
+
+        return sorted(self._days.get(date.toordinal(), []), key=Agenda._entry_sort_key)
+
+    def days(self, begin: datetime.date, end: datetime.date) -> List[AgendaEntry]:
+        """
+        Returns the entries from begin up to and including end, sorted
+        by day; within a day timed ones first.
+        """
+
+        result: List[AgendaEntry] = []
+        for ordinal in range(begin.toordinal(), end.toordinal() + 1):
+            entries = self._days.get(ordinal)
+            if entries:
+                result.extend(sorted(entries, key=Agenda._entry_sort_key))
+        return result
+
+    def week(self, date: datetime.date) -> List[AgendaEntry]:
+        """
+        Returns the entries of the week (Monday to Sunday) containing date.
+        """
+
+        monday = date - datetime.timedelta(days=date.weekday())
+        return self.days(monday, monday + datetime.timedelta(days=6))
+
+    def overdue(self, today: Optional[datetime.date] = None) -> List[AgendaEntry]:
+        """
+        Returns the entries dated before today whose heading is not
+        done, oldest first. Repeating time-stamps are only considered
+        with their date in the file.
+        """
+
+        today = today or datetime.date.today()
+        overdue_index = self._overdue_index
+        if overdue_index is None:
+            with self._overdue_index_lock:
+                overdue_index = self._overdue_index
+                if overdue_index is None:
+                    entries = sorted(self._open_entries,
+                                     key=lambda entry: (entry.date, Agenda._entry_sort_key(entry)))
+                    overdue_index = self._overdue_index = ([entry.date.toordinal() for entry in entries], entries)
+        end = bisect.bisect_left(overdue_index[0], today.toordinal())
+        return overdue_index[1][:end]
+
+    @staticmethod
+    def _entry_sort_key(entry: AgendaEntry) -> Tuple[bool, datetime.time]:
+        return (entry.time is None, entry.time or datetime.time())
+
+    def _add_timestamp(self, filename: str, heading_offset: int, heading: re.Match[str],
+                       planning: str, timestamp: str) -> None:
+        components = Agenda.TIMESTAMP_REGEX.match(timestamp)
+        if not components:
+            return
+        try:
+            date = datetime.date(int(components.group(1)), int(components.group(2)), int(components.group(3)))
+            entry_time = datetime.time(int(components.group(4)), int(components.group(5))) \
+                if components.group(4) else None
+        except ValueError:
+            return  # invalid date or time
+
+        # matches every rest of a heading line:
+        keyword, priority, title, tags = self._title_regex.match(heading.group(2)).groups()  # type: ignore[union-attr]
+        entry = AgendaEntry(filename=filename,
+                            offset=heading_offset,
+                            level=len(heading.group(1)),
+                            keyword=keyword,
+                            priority=priority,
+                            title=title,
+                            tags=tuple(tags.split(':')) if tags else (),
+                            planning=planning,
+                            timestamp=timestamp,
+                            date=date,
+                            time=entry_time,
+                            repeated=False)
+        self._days.setdefault(date.toordinal(), []).append(entry)
+
+        if entry.keyword not in self.done_keywords:
+            self._open_entries.append(entry)
+            self._overdue_index = None
+
+        if components.group(6):
+            for occurrence in Agenda._occurrences(date, int(components.group(7)),
+                                                  components.group(8), self.expand_until):
+                self._days.setdefault(occurrence.toordinal(), []).append(
+                    entry._replace(date=occurrence, repeated=True))
+
+    @staticmethod
+    def _occurrences(date: datetime.date, count: int, unit: str,
+                     until: datetime.date) -> Iterable[datetime.date]:
+        """
+        Yields the dates after date repeating every count units up to until.
+        """
+
+        if count <= 0 or unit == 'h':
+            return
+        step = 1
+        while True:
+            if unit == 'd' or unit == 'w':
+                occurrence = date + datetime.timedelta(days=count * step * (7 if unit == 'w' else 1))
+            else:
+                months = date.month - 1 + count * step * (12 if unit == 'y' else 1)
+                year = date.year + months // 12
+                month = months % 12 + 1
+                if year > datetime.MAXYEAR:
+                    return
+                occurrence = datetime.date(year, month,
+                                           min(date.day, calendar.monthrange(year, month)[1]))
+            if occurrence > until:
+                return
+            yield occurrence
+            step += 1
+
+# Local Variables:
+# End:
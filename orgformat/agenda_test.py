@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import datetime
+import os
+import tempfile
+import concurrent.futures
+from orgformat import OrgFormat
+from orgformat.agenda import Agenda
+
+
+class TestAgenda(unittest.TestCase):
+
+    ORGTEXT = OrgFormat.generate_heading(level=1,
+                                         keyword='TODO',
+                                         priority='A',
+                                         title='This is my title',
+                                         tags=['foo', 'bar_baz'],
+                                         scheduled_timestamp='<2019-12-29 Sun 11:35>',
+                                         deadline_timestamp='<2019-12-30 Mon 23:59>',
+                                         properties=[('ID', 'foo-123')],
+                                         section='SCHEDULED: <2019-12-01 Sun> is not a planning line') + \
+        OrgFormat.generate_heading(level=2,
+                                   keyword='DONE',
+                                   title='finished',
+                                   scheduled_timestamp='<2019-12-29 Sun>') + \
+        OrgFormat.generate_heading(level=2,
+                                   title='weekly',
+                                   scheduled_timestamp='<2019-12-02 Mon 10:00 +1w>') + \
+        OrgFormat.generate_heading(level=1,
+                                   title='end of month',
+                                   deadline_timestamp='<2019-10-31 Thu .+1m>') + \
+        OrgFormat.generate_heading(level=1,
+                                   title='invalid',
+                                   deadline_timestamp='<2019-02-31 Thu>')
+
+    def setUp(self):
+        self.agenda = Agenda(expand_until=datetime.date(2020, 3, 1))
+        self.agenda.add_text(self.ORGTEXT, 'test.org')
+
+    def test_day(self):
+
+        entries = self.agenda.day(datetime.date(2019, 12, 29))
+        self.assertEqual([(entry.title, entry.planning, entry.time) for entry in entries],
+                         [('This is my title', 'SCHEDULED', datetime.time(11, 35)),
+                          ('finished', 'SCHEDULED', None)])
+        entry = entries[0]
+        self.assertEqual(entry.filename, 'test.org')
+        self.assertEqual(entry.offset, 0)
+        self.assertEqual(entry.level, 1)
+        self.assertEqual(entry.keyword, 'TODO')
+        self.assertEqual(entry.priority, 'A')
+        self.assertEqual(entry.tags, ('foo', 'bar_baz'))
+        self.assertEqual(entry.timestamp, '<2019-12-29 Sun 11:35>')
+        self.assertFalse(entry.repeated)
+        self.assertEqual(self.ORGTEXT[entries[1].offset:].split('\n')[0], '** DONE finished')
+
+        self.assertEqual(self.agenda.day(datetime.date(2019, 12, 1)), [])
+        self.assertEqual(self.agenda.day(datetime.date(2019, 2, 28)), [])
+
+    def test_repeater(self):
+
+        weekly = [entry for entry in self.agenda.days(datetime.date(2019, 12, 1), datetime.date(2020, 3, 1))
+                  if entry.title == 'weekly']
+        self.assertEqual(len(weekly), 13)
+        self.assertEqual(weekly[1].date, datetime.date(2019, 12, 9))
+        self.assertTrue(weekly[1].repeated)
+        self.assertEqual(weekly[-1].date, datetime.date(2020, 2, 24))
+
+        end_of_month = [entry.date for entry in self.agenda.days(datetime.date(2019, 10, 1), datetime.date(2020, 3, 1))
+                        if entry.title == 'end of month']
+        self.assertEqual(end_of_month, [datetime.date(2019, 10, 31), datetime.date(2019, 11, 30),
+                                        datetime.date(2019, 12, 31), datetime.date(2020, 1, 31),
+                                        datetime.date(2020, 2, 29)])
+
+    def test_week(self):
+
+        self.assertEqual([(entry.date, entry.title) for entry in self.agenda.week(datetime.date(2019, 12, 29))],
+                         [(datetime.date(2019, 12, 23), 'weekly'),
+                          (datetime.date(2019, 12, 29), 'This is my title'),
+                          (datetime.date(2019, 12, 29), 'finished')])
+
+    def test_overdue(self):
+
+        ## the sorted index gets built once for concurrent queries:
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda _: self.agenda.overdue(datetime.date(2019, 12, 30)), range(64)))
+        self.assertTrue(all(result == results[0] for result in results))
+
+        self.assertEqual([(entry.title, entry.planning) for entry in self.agenda.overdue(datetime.date(2019, 12, 30))],
+                         [('end of month', 'DEADLINE'),
+                          ('weekly', 'SCHEDULED'),
+                          ('This is my title', 'SCHEDULED')])
+        self.assertEqual(self.agenda.overdue(datetime.date(2019, 1, 1)), [])
+
+        ## adding text invalidates the sorted overdue index:
+        self.agenda.add_text('* TODO old\nDEADLINE: <2000-01-01 Sat>\n', 'other.org')
+        self.assertEqual(self.agenda.overdue(datetime.date(2019, 1, 1))[0].filename, 'other.org')
+
+    def test_add_file(self):
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'test.org')
+            with open(filename, 'w', encoding='utf-8') as orgfile:
+                orgfile.write(self.ORGTEXT)
+            agenda = Agenda([filename], expand_until=datetime.date(2020, 3, 1))
+        self.assertEqual(agenda.day(datetime.date(2019, 12, 29))[0].filename, filename)
+
+
+# Local Variables:
+# End:
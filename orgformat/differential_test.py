@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Differential tests: faster code paths (candidates) are compared with
+# the reference implementations for random valid and invalid inputs.
+#
+# The reference_* functions below are copies of the time.strptime() and
+# datetime based implementations the library shipped before the faster
+# code paths replaced them. They are frozen: do not change them along
+# with the library. Functions without a faster code path, such as
+# dhms_from_sec(), are not covered here.
+#
+# The amount of inputs per engine and the seed can be raised for
+# extensive runs, the throughput of each engine is written to the
+# given report file:
+#
+#   ORGFORMAT_DIFFERENTIAL_ITERATIONS=1000000 ORGFORMAT_DIFFERENTIAL_REPORT=bench_output.txt \
+#       PYTHONPATH=. pytest orgformat/differential_test.py
+
+import unittest
+import calendar
+import datetime
+import os
+import random
+import time
+from orgformat import OrgFormat, TimestampParseException, TimestampFormatter
+
+ITERATIONS = int(os.environ.get('ORGFORMAT_DIFFERENTIAL_ITERATIONS', '2000'))
+SEED = int(os.environ.get('ORGFORMAT_DIFFERENTIAL_SEED', '42'))
+REPORT = os.environ.get('ORGFORMAT_DIFFERENTIAL_REPORT')
+
+ARABIC_INDIC_DIGITS = str.maketrans('0123456789', '\u0660\u0661\u0662\u0663\u0664\u0665\u0666\u0667\u0668\u0669')
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun',
+            'Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So', 'Die', 'Mit', 'Don', 'Fre', 'Sam', 'Son']
+
+
+def random_date(rng):
+    """
+    Returns year, month, day with a bias towards edge cases; some of
+    them are invalid.
+    """
+
+    year = rng.choice([rng.randint(1000, 2999), 1000, 1899, 1900, 2000, 2999, rng.choice([1996, 2004, 2100])])
+    month = rng.choice([rng.randint(1, 12), 1, 2, 12, 0, 13])
+    day = rng.choice([rng.randint(1, 28), 1, 28, 29, 30, 31, 0, 32])
+    return year, month, day
+
+
+def random_time(rng):
+    return rng.choice([rng.randint(0, 23), 0, 23, 24]), rng.choice([rng.randint(0, 59), 0, 59, 60])
+
+
+def random_orgmode_timestamp(rng):
+    year, month, day = random_date(rng)
+    result = '%04d-%02d-%02d' % (year, month, day)
+    if rng.random() < 0.8:
+        result += ' ' + rng.choice(WEEKDAYS + ['Bla'])
+    if rng.random() < 0.6:
+        hour, minute = random_time(rng)
+        result += ' %02d:%02d' % (hour, minute)
+    if rng.random() < 0.5:
+        result = '<' + result + '>'
+    else:
+        result = '[' + result + ']'
+    if rng.random() < 0.05:
+        # invalid characters or truncated:
+        position = rng.randint(0, len(result) - 1)
+        result = result[:position] + rng.choice(['', 'x', ' ', '-'])
+    return result
+
+
+def random_valid_orgmode_timestamp(rng, opening, has_time):
+    """
+    Returns a valid time-stamp with the given opening bracket, with or
+    without time of day.
+    """
+
+    year = rng.choice([rng.randint(1000, 2999), 1000, 1900, 2000, 2999, rng.choice([1996, 2004, 2100])])
+    month = rng.choice([rng.randint(1, 12), 1, 2, 12])
+    day = rng.choice([rng.randint(1, calendar.monthrange(year, month)[1]), 1, calendar.monthrange(year, month)[1]])
+    result = opening + '%04d-%02d-%02d' % (year, month, day)
+    if rng.random() < 0.8:
+        result += ' ' + rng.choice(WEEKDAYS)
+    if has_time:
+        result += ' %02d:%02d' % (rng.choice([rng.randint(0, 23), 0, 23]), rng.choice([rng.randint(0, 59), 0, 59]))
+    return result + ('>' if opening == '<' else ']')
+
+
+def random_extended_iso(rng):
+    year, month, day = random_date(rng)
+    result = '%04d-%s-%s' % (year,
+                             rng.choice(['%02d', '%d'] if month < 10 else ['%02d']) % month,
+                             rng.choice(['%02d', '%d'] if day < 10 else ['%02d']) % day)
+    if rng.random() < 0.7:
+        hour, minute = random_time(rng)
+        second = rng.choice([0, 59, rng.randint(0, 59)])
+        result += rng.choice(['T', ' ']) + ('%d' if rng.random() < 0.3 else '%02d') % hour + \
+            rng.choice([':', '.']) + ('%d' if rng.random() < 0.3 else '%02d') % minute
+        if rng.random() < 0.5:
+            result += rng.choice([':', '.']) + ('%d' if rng.random() < 0.3 else '%02d') % second
+    if rng.random() < 0.05:
+        result = rng.choice(['x', '11-1-3', '']) + result[rng.randint(0, 4):]
+    return result
+
+
+def random_basic_iso(rng):
+    """
+    Returns mostly zero-padded strings; some fields are unpadded or
+    padded with a blank, which time.strptime() accepts as well.
+    """
+
+    def field(value):
+        return rng.choice(['%02d', '%02d', '%02d', '%d', '%2d']) % value
+
+    year, month, day = random_date(rng)
+    hour, minute = random_time(rng)
+    second = rng.choice([rng.randint(0, 59), 60, 61, 62])
+    choice = rng.random()
+    result = '%04d%s%s' % (year, field(month), field(day))
+    if choice < 0.6:
+        result += rng.choice('Tt') + field(hour) + field(minute) + field(second)
+        if choice < 0.3:
+            result += rng.choice('Zz')
+    elif choice < 0.65:
+        result += 'x'
+    elif choice < 0.8:
+        result = '%04d-%s-%sT%s:%s:%s.' % (year, field(month), field(day), field(hour), field(minute), field(second))
+        ## filled up with fractional digits to the 27 characters of the full format:
+        result += ''.join(rng.choice('0123456789') for _ in range(26 - len(result))) + 'Z'
+    return result
+
+
+def random_struct_time(rng):
+    while True:
+        year, month, day = random_date(rng)
+        if OrgFormat.is_valid_date(year, month, day):
+            hour, minute = random_time(rng)
+            return time.struct_time((year, month, day, min(hour, 23), min(minute, 59),
+                                     rng.randint(0, 59), rng.randint(0, 6), rng.randint(0, 366), rng.randint(-1, 1)))
+
+
+def reference_fix_struct_time_wday(tuple_date):
+    """
+    The datetime based implementation of OrgFormat.fix_struct_time_wday().
+    """
+
+    datetimestamp = OrgFormat.struct_time_to_datetime(tuple_date)
+    return time.struct_time((datetimestamp.year, datetimestamp.month, datetimestamp.day,
+                             datetimestamp.hour, datetimestamp.minute, datetimestamp.second,
+                             datetimestamp.weekday(), 0, 0))
+
+
+def reference_date(tuple_date, show_time):
+    """
+    The datetime based implementation of OrgFormat.date() for struct_time.
+    """
+
+    local_structtime = reference_fix_struct_time_wday(tuple_date)
+    if show_time:
+        return '<' + time.strftime("%Y-%m-%d %a %H:%M", local_structtime) + '>'
+    return '<' + time.strftime("%Y-%m-%d %a", local_structtime) + '>'
+
+
+def reference_parse_extended_iso_datetime(datetime_string):
+    """
+    The time.strptime() based implementation of OrgFormat.parse_extended_iso_datetime().
+    """
+
+    components = OrgFormat.ISODATETIME_REGEX.match(datetime_string)
+    if not components:
+        raise TimestampParseException(datetime_string)
+    date, time_with_seconds, hours_minutes, seconds = components.group(1, 4, 5, 6)
+    if seconds:
+        return time.strptime(date + 'T' + time_with_seconds.replace(':', '.'), '%Y-%m-%dT%H.%M.%S')
+    if hours_minutes:
+        return time.strptime(date + 'T' + hours_minutes.replace(':', '.'), '%Y-%m-%dT%H.%M')
+    return time.strptime(date, '%Y-%m-%d')
+
+
+def reference_parse_basic_iso_datetime(datetime_string):
+    """
+    The time.strptime() based implementation of OrgFormat.parse_basic_iso_datetime().
+    """
+
+    try:
+        if len(datetime_string) == 16:
+            return time.localtime(calendar.timegm(time.strptime(datetime_string, '%Y%m%dT%H%M%SZ')))
+        elif len(datetime_string) == 15:
+            return time.strptime(datetime_string, '%Y%m%dT%H%M%S')
+        elif len(datetime_string) == 8:
+            return time.strptime(datetime_string, '%Y%m%d')
+        elif len(datetime_string) == 27:
+            return time.localtime(calendar.timegm(time.strptime(datetime_string.split('.')[0] + 'Z',
+                                                                '%Y-%m-%dT%H:%M:%SZ')))
+        raise TimestampParseException(datetime_string)
+    except ValueError as e:
+        raise TimestampParseException(e)
+
+
+def outcome(function, argument):
+    """
+    Returns the result or the type of the raised exception.
+    """
+
+    try:
+        return function(*argument)
+    except (TimestampParseException, ValueError, OverflowError) as e:
+        return type(e)
+
+
+class TestDifferential(unittest.TestCase):
+
+    throughput = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if REPORT:
+            with open(REPORT, 'a') as report:
+                report.write('differential test: %d inputs per engine, seed %d\n' % (ITERATIONS, SEED))
+                for name, calls_per_second in sorted(cls.throughput.items()):
+                    report.write('  %-70s %12.0f calls/s\n' % (name, calls_per_second))
+
+    def measure(self, name, function, arguments, items_per_call=1):
+        start = time.perf_counter()
+        results = [outcome(function, argument) for argument in arguments]
+        duration = time.perf_counter() - start
+        TestDifferential.throughput[name] = len(arguments) * items_per_call / duration if duration else float('inf')
+        return results
+
+    def compare(self, name, reference, candidate, arguments, items_per_call=1):
+        """
+        Asserts equal results or exception types of reference and candidate for all arguments.
+        """
+
+        expected = self.measure(name + ': reference', reference, arguments, items_per_call)
+        actual = self.measure(name + ': candidate', candidate, arguments, items_per_call)
+        mismatches = [(argument, wanted, got) for argument, wanted, got in zip(arguments, expected, actual)
+                      if wanted != got]
+        self.assertEqual(mismatches[:5], [], '%d of %d inputs differ' % (len(mismatches), len(arguments)))
+
+    def test_orgmode_timestamp_to_datetime_from_buffer(self):
+        rng = random.Random(SEED)
+        inputs = [random_orgmode_timestamp(rng) for _ in range(ITERATIONS)]
+        self.compare('orgmode_timestamp_to_datetime_from_buffer',
+                     OrgFormat.orgmode_timestamp_to_datetime,
+                     lambda orgtime: OrgFormat.orgmode_timestamp_to_datetime_from_buffer(orgtime.encode('ascii')),
+                     [(orgtime,) for orgtime in inputs])
+
+    def test_parse_extended_iso_datetime_from_buffer(self):
+        rng = random.Random(SEED)
+        inputs = [random_extended_iso(rng) for _ in range(ITERATIONS)]
+        self.compare('parse_extended_iso_datetime_from_buffer',
+                     OrgFormat.parse_extended_iso_datetime,
+                     lambda string: OrgFormat.parse_extended_iso_datetime_from_buffer(memoryview(string.encode('ascii'))),
+                     [(string,) for string in inputs])
+
+    def test_parse_basic_iso_datetime_from_buffer(self):
+        rng = random.Random(SEED)
+        inputs = [random_basic_iso(rng) for _ in range(ITERATIONS)]
+        self.compare('parse_basic_iso_datetime_from_buffer',
+                     OrgFormat.parse_basic_iso_datetime,
+                     lambda string: OrgFormat.parse_basic_iso_datetime_from_buffer(string.encode('ascii'),
+                                                                                   0, len(string)),
+                     [(string,) for string in inputs])
+
+    def test_parse_extended_iso_datetime(self):
+        rng = random.Random(SEED)
+        inputs = [(random_extended_iso(rng),) for _ in range(ITERATIONS)]
+        self.compare('parse_extended_iso_datetime vs. strptime', reference_parse_extended_iso_datetime,
+                     OrgFormat.parse_extended_iso_datetime, inputs)
+
+        def reference_strdate(string, show_time):
+            components = OrgFormat.ISODATETIME_REGEX.match(string)
+            if components and components.group(5):
+                try:
+                    return OrgFormat.date(time.strptime(components.group(1) + 'T' +
+                                                        components.group(5).replace(':', '.'), '%Y-%m-%dT%H.%M'),
+                                          show_time=show_time)
+                except ValueError:
+                    raise TimestampParseException(string)
+            return OrgFormat.date(reference_parse_extended_iso_datetime(string), show_time=show_time)
+
+        inputs = [(random_extended_iso(rng), rng.random() < 0.5) for _ in range(ITERATIONS)]
+        self.compare('strdate vs. strptime', reference_strdate, OrgFormat.strdate, inputs)
+
+    def test_parse_basic_iso_datetime(self):
+        rng = random.Random(SEED)
+        inputs = [(random_basic_iso(rng),) for _ in range(ITERATIONS)]
+        ## time.strptime() accepts all Unicode digits:
+        inputs += [(string.translate(ARABIC_INDIC_DIGITS),) for string, in inputs[:ITERATIONS // 10]]
+        self.compare('parse_basic_iso_datetime vs. strptime', reference_parse_basic_iso_datetime,
+                     OrgFormat.parse_basic_iso_datetime, inputs)
+
+    def test_extract_datetimes(self):
+        rng = random.Random(SEED)
+
+        def extracted_strdate(string, show_time):
+            found = OrgFormat.extract_datetimes(string)
+            if not found or found[0].start != 0:
+                raise TimestampParseException('no date found')
+            return OrgFormat.date(found[0].struct_time, show_time=show_time)
+
+        ## extract_datetimes() is deliberately more lenient (e.g., on single digit months
+        ## 6-9 which ISODATETIME_REGEX does not accept), so only inputs accepted by
+        ## strdate() are compared:
+        inputs = []
+        while len(inputs) < ITERATIONS:
+            argument = (random_extended_iso(rng), rng.random() < 0.5)
+            if not isinstance(outcome(OrgFormat.strdate, argument), type):
+                inputs.append(argument)
+        self.compare('extract_datetimes + date vs. strdate', OrgFormat.strdate, extracted_strdate, inputs)
+
+    def test_timestamp_sort_key(self):
+        rng = random.Random(SEED)
+        inputs = []
+        for _ in range(ITERATIONS):
+            ## both valid and of the same kind:
+            opening, has_time = rng.choice('<['), rng.random() < 0.6
+            first = random_valid_orgmode_timestamp(rng, opening, has_time)
+            second = random_valid_orgmode_timestamp(rng, opening, has_time)
+            if rng.random() < 0.2:
+                ## the same day:
+                second = first[:11] + second[11:]
+            inputs.append((first, second))
+
+        def compare_datetimes(first, second):
+            first = OrgFormat.orgmode_timestamp_to_datetime(first)
+            second = OrgFormat.orgmode_timestamp_to_datetime(second)
+            return (first > second) - (first < second)
+
+        def compare_keys(first, second):
+            first = OrgFormat.timestamp_sort_key(first)
+            second = OrgFormat.timestamp_sort_key(second)
+            return (first > second) - (first < second)
+
+        self.compare('timestamp_sort_key ordering', compare_datetimes, compare_keys, inputs)
+
+        ## sorting all of them at once, the throughput in time-stamps per second:
+        orgtimes = [orgtime for pair in inputs for orgtime in pair]
+
+        def datetime_key(orgtime):
+            return OrgFormat.orgmode_timestamp_to_datetime(orgtime), ':' in orgtime, orgtime[0]
+
+        self.compare('sort_by_timestamp (time-stamps)',
+                     lambda: sorted(orgtimes, key=datetime_key),
+                     lambda: OrgFormat.sort_by_timestamp(orgtimes), [()], len(orgtimes))
+
+    def test_fix_struct_time_wday(self):
+        rng = random.Random(SEED)
+        inputs = [(random_struct_time(rng),) for _ in range(ITERATIONS)]
+        self.compare('fix_struct_time_wday', reference_fix_struct_time_wday, OrgFormat.fix_struct_time_wday, inputs)
+
+    def test_date(self):
+        rng = random.Random(SEED)
+        inputs = [(random_struct_time(rng), rng.random() < 0.5) for _ in range(ITERATIONS)]
+        self.compare('date', reference_date, lambda tuple_date, show_time: OrgFormat.date(tuple_date, show_time),
+                     inputs)
+
+    def test_timestamp_formatter(self):
+        rng = random.Random(SEED)
+        inputs = [(random_struct_time(rng),) for _ in range(ITERATIONS)]
+        inputs += [(OrgFormat.struct_time_to_datetime(struct_time),) for struct_time, in inputs]
+        for show_time in (False, True):
+            for inactive in (False, True):
+                formatter = TimestampFormatter(show_time=show_time, inactive=inactive, repeater='+1w')
+                self.compare('TimestampFormatter(show_time=%s, inactive=%s)' % (show_time, inactive),
+                             lambda tuple_date: OrgFormat.date(tuple_date, show_time=show_time, inactive=inactive,
+                                                               repeater_or_delay='+1w'),
+                             formatter.format, inputs)
+
+    def test_weekday(self):
+        rng = random.Random(SEED)
+        inputs = [random_date(rng) for _ in range(ITERATIONS)]
+        self.compare('weekday', lambda year, month, day: datetime.date(year, month, day).weekday(),
+                     OrgFormat.weekday, inputs)
+        self.compare('is_valid_date', lambda year, month, day: 1 <= month <= 12 and
+                     1 <= day <= calendar.monthrange(year, month)[1],
+                     OrgFormat.is_valid_date, inputs)
+
+
+# Local Variables:
+# End:
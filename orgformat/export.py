@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+# Find much more example calls in the unit test file export_test.py
+# -*- coding: utf-8; mode: python; -*-
+
+import array
+import bisect
+import calendar
+import functools
+import importlib
+import itertools
+import sys
+from typing import List, Tuple, Optional, Iterable, Iterator, Sequence, Dict, Any, Union, Callable  # mypy: type checks
+
+from orgformat.orgformat import OrgFormat, heading_title_regex
+from orgformat.scanner import ScannedFile
+
+# pyarrow is optional (orgformat[arrow]); only the to_arrow() methods require it:
+try:
+    pyarrow: Any = importlib.import_module('pyarrow')
+except ImportError:
+    pyarrow = None
+
+# Arrow offsets and dictionary indices are 32 bit integers:
+INT32 = 'i'
+assert array.array(INT32).itemsize == 4
+
+DEFAULT_BATCH_ROWS = 65536
+
+
+def _arrow_buffer(values: Union['array.array[int]', bytearray]) -> Any:
+    """
+    Returns a pyarrow buffer referring to the memory of values
+    without copying it. Arrow is little-endian; only big-endian
+    machines get a byte-swapped copy.
+    """
+
+    if sys.byteorder == 'big' and isinstance(values, array.array) and values.itemsize > 1:
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return pyarrow.py_buffer(values)
+
+
+def _require_pyarrow() -> None:
+    if pyarrow is None:
+        raise ImportError('to_arrow() requires pyarrow; install orgformat[arrow]')
+
+
+def _running_offsets(start: int, lengths: Iterable[int]) -> Iterator[int]:
+    # the end offsets of consecutive items of the given lengths
+    return itertools.islice(itertools.accumulate(lengths, initial=start), 1, None)
+
+
+class Bitmap(object):
+    """
+    Booleans which to_bytearray() packs into bits, least significant
+    bit first, in the layout of Arrow validity bitmaps and boolean
+    arrays. Only the positions of False values are collected since
+    validity bitmaps are mostly True.
+    """
+
+    def __init__(self) -> None:
+        self.length = 0
+        self.unset: List[int] = []  # positions of the False values; sorted
+
+    def extend(self, values: Sequence[bool]) -> None:
+        length = self.length
+        self.unset.extend([length + index for index, value in enumerate(values) if not value])
+        self.length += len(values)
+
+    def extend_set(self, count: int) -> None:
+        self.length += count
+
+    def __getitem__(self, index: int) -> bool:
+        position = bisect.bisect_left(self.unset, index)
+        return position == len(self.unset) or self.unset[position] != index
+
+    def to_bytearray(self) -> bytearray:
+        full_bytes, rest = divmod(self.length, 8)
+        bits = bytearray(b'\xff' * full_bytes)
+        if rest:
+            bits.append((1 << rest) - 1)
+        for index in self.unset:
+            bits[index >> 3] &= ~(1 << (index & 7))
+        return bits
+
+    def validity_buffer(self) -> Any:
+        """
+        Returns the pyarrow buffer of a validity bitmap; None if all bits are set.
+        """
+
+        return _arrow_buffer(self.to_bytearray()) if self.unset else None
+
+
+class Int64Column(object):
+    """
+    Nullable 64 bit integers in an array('q').
+    """
+
+    def __init__(self) -> None:
+        self.values = array.array('q')
+        self.validity = Bitmap()
+
+    def extend(self, values: Sequence[Optional[int]]) -> None:
+        if None in values:
+            self.values.extend([value or 0 for value in values])
+            self.validity.extend([value is not None for value in values])
+        else:
+            self.values.extend(values)  # type: ignore[arg-type]
+            self.validity.extend_set(len(values))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def to_pylist(self) -> List[Optional[int]]:
+        return [value if self.validity[index] else None for index, value in enumerate(self.values)]
+
+    def _arrow_type(self) -> Any:
+        return pyarrow.int64()
+
+    def to_arrow(self) -> Any:
+        _require_pyarrow()
+        return pyarrow.Array.from_buffers(self._arrow_type(), len(self),
+                                          [self.validity.validity_buffer(), _arrow_buffer(self.values)],
+                                          len(self.validity.unset))
+
+
+class TimestampColumn(Int64Column):
+    """
+    Nullable seconds since 1970-01-01 00:00 of the wall-clock time;
+    Org mode time-stamps have no time zone.
+    """
+
+    def _arrow_type(self) -> Any:
+        return pyarrow.timestamp('s')
+
+
+class BooleanColumn(object):
+    """
+    Booleans in a Bitmap.
+    """
+
+    def __init__(self) -> None:
+        self.values = Bitmap()
+
+    def extend(self, values: Sequence[bool]) -> None:
+        self.values.extend(values)
+
+    def __len__(self) -> int:
+        return self.values.length
+
+    def to_pylist(self) -> List[bool]:
+        return [self.values[index] for index in range(len(self))]
+
+    def to_arrow(self) -> Any:
+        _require_pyarrow()
+        return pyarrow.Array.from_buffers(pyarrow.bool_(), len(self),
+                                          [None, _arrow_buffer(self.values.to_bytearray())], 0)
+
+
+class StringColumn(object):
+    """
+    Nullable strings as UTF-8 data plus the offsets of each string
+    within it, like Arrow string arrays.
+    """
+
+    def __init__(self) -> None:
+        self.offsets = array.array(INT32, [0])
+        self.data = bytearray()
+        self.validity = Bitmap()
+
+    def extend(self, values: Sequence[Optional[str]]) -> None:
+        if None in values:
+            encoded = [value.encode('utf-8') if value is not None else b'' for value in values]
+            self.validity.extend([value is not None for value in values])
+        else:
+            encoded = [value.encode('utf-8') for value in values]  # type: ignore[union-attr]
+            self.validity.extend_set(len(values))
+        self.offsets.extend(_running_offsets(len(self.data), map(len, encoded)))
+        self.data += b''.join(encoded)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> Optional[str]:
+        if not self.validity[index]:
+            return None
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def to_pylist(self) -> List[Optional[str]]:
+        return [self[index] for index in range(len(self))]
+
+    def to_arrow(self) -> Any:
+        _require_pyarrow()
+        return pyarrow.Array.from_buffers(pyarrow.string(), len(self),
+                                          [self.validity.validity_buffer(), _arrow_buffer(self.offsets),
+                                           _arrow_buffer(self.data)],
+                                          len(self.validity.unset))
+
+
+class DictionaryColumn(object):
+    """
+    Nullable strings stored once in the dictionary and referred to by
+    their index, like Arrow dictionary arrays. Suits repetitive values
+    such as file names, keywords or tags.
+    """
+
+    def __init__(self) -> None:
+        self.indices = array.array(INT32)
+        self.validity = Bitmap()
+        self.dictionary = StringColumn()
+        self._codes: Dict[Optional[str], int] = {}
+
+    def extend(self, values: Sequence[Optional[str]]) -> None:
+        codes = self._codes
+        new_values = []
+        for value in values:
+            if value not in codes and value is not None:
+                codes[value] = len(codes)
+                new_values.append(value)
+        self.dictionary.extend(new_values)
+        # nulls get index 0 and are marked as invalid:
+        self.indices.extend([codes.get(value, 0) for value in values])
+        if None in values:
+            self.validity.extend([value is not None for value in values])
+        else:
+            self.validity.extend_set(len(values))
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def to_pylist(self) -> List[Optional[str]]:
+        dictionary = self.dictionary.to_pylist()
+        return [dictionary[code] if self.validity[index] else None for index, code in enumerate(self.indices)]
+
+    def to_arrow(self) -> Any:
+        _require_pyarrow()
+        indices = pyarrow.Array.from_buffers(pyarrow.int32(), len(self),
+                                             [self.validity.validity_buffer(), _arrow_buffer(self.indices)],
+                                             len(self.validity.unset))
+        return pyarrow.DictionaryArray.from_arrays(indices, self.dictionary.to_arrow(), safe=False)
+
+
+class ListColumn(object):
+    """
+    Lists of strings such as tags: the values of all lists in one
+    DictionaryColumn plus the offsets of each list within it.
+    """
+
+    def __init__(self) -> None:
+        self.offsets = array.array(INT32, [0])
+        self.values = DictionaryColumn()
+
+    def extend(self, lists: Sequence[Sequence[str]]) -> None:
+        self.values.extend([value for values in lists for value in values])
+        self.offsets.extend(_running_offsets(self.offsets[-1], map(len, lists)))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def to_pylist(self) -> List[List[Optional[str]]]:
+        values = self.values.to_pylist()
+        return [values[self.offsets[index]:self.offsets[index + 1]] for index in range(len(self))]
+
+    def to_arrow(self) -> Any:
+        _require_pyarrow()
+        offsets = pyarrow.Array.from_buffers(pyarrow.int32(), len(self.offsets), [None, _arrow_buffer(self.offsets)])
+        return pyarrow.ListArray.from_arrays(offsets, self.values.to_arrow())
+
+
+class MapColumn(object):
+    """
+    Ordered key/value pairs such as properties: all keys and all
+    values in one StringColumn each plus the offsets of each map.
+    """
+
+    def __init__(self) -> None:
+        self.offsets = array.array(INT32, [0])
+        self.keys = StringColumn()
+        self.values = StringColumn()
+
+    def extend(self, maps: Sequence[Sequence[Tuple[str, str]]]) -> None:
+        self.keys.extend([key for items in maps for key, _ in items])
+        self.values.extend([value for items in maps for _, value in items])
+        self.offsets.extend(_running_offsets(self.offsets[-1], map(len, maps)))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def to_pylist(self) -> List[List[Tuple[Optional[str], Optional[str]]]]:
+        items = list(zip(self.keys.to_pylist(), self.values.to_pylist()))
+        return [items[self.offsets[index]:self.offsets[index + 1]] for index in range(len(self))]
+
+    def to_arrow(self) -> Any:
+        _require_pyarrow()
+        offsets = pyarrow.Array.from_buffers(pyarrow.int32(), len(self.offsets), [None, _arrow_buffer(self.offsets)])
+        return pyarrow.MapArray.from_arrays(offsets, self.keys.to_arrow(), self.values.to_arrow())
+
+
+Column = Union[Int64Column, BooleanColumn, StringColumn, DictionaryColumn, ListColumn, MapColumn]
+
+# names and column types of the batches:
+Schema = Sequence[Tuple[str, Callable[[], Column]]]
+
+HEADING_SCHEMA: Schema = (('filename', DictionaryColumn), ('offset', Int64Column), ('level', Int64Column),
+                          ('keyword', DictionaryColumn), ('priority', DictionaryColumn), ('title', StringColumn),
+                          ('tags', ListColumn), ('properties', MapColumn))
+
+TIMESTAMP_SCHEMA: Schema = (('filename', DictionaryColumn), ('offset', Int64Column), ('heading_offset', Int64Column),
+                            ('timestamp', TimestampColumn), ('active', BooleanColumn), ('has_time', BooleanColumn),
+                            ('text', StringColumn))
+
+
+class ColumnarBatch(object):
+    """
+    Equally long, named columns: a record batch. The memory layout of
+    the columns is the one of Arrow so that to_arrow() wraps them
+    without copying; without pyarrow, the array.array objects and
+    bytearrays of the columns can be used directly.
+
+    batch.to_pydict()
+    -> {'filename': ['notes.org'], 'offset': [0], ...}
+
+    pyarrow.Table.from_batches(batch.to_arrow() for batch in heading_batches(scan_directory('~/org')))
+    -> pyarrow.Table
+
+    The columns must not be extended after to_arrow() since the
+    Arrow arrays refer to their memory.
+    """
+
+    def __init__(self, schema: Schema) -> None:
+        self.names = [name for name, _ in schema]
+        self.columns = [column() for _, column in schema]
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    def column(self, name: str) -> Column:
+        return self.columns[self.names.index(name)]
+
+    def to_pydict(self) -> Dict[str, List[Any]]:
+        return {name: column.to_pylist() for name, column in zip(self.names, self.columns)}
+
+    def to_arrow(self) -> Any:
+        """
+        Returns a pyarrow.RecordBatch sharing the memory of the columns.
+
+        @raise ImportError: if pyarrow is not installed
+        """
+
+        _require_pyarrow()
+        return pyarrow.RecordBatch.from_arrays([column.to_arrow() for column in self.columns], names=self.names)
+
+
+def _batches(schema: Schema, files: Iterable[Sequence[Sequence[Any]]], batch_rows: int) -> Iterator[ColumnarBatch]:
+    """
+    Yields ColumnarBatch objects of at most batch_rows rows from the
+    column values of one file after another. The values are added a
+    file at a time instead of a row at a time.
+    """
+
+    batch = None
+    for values in files:
+        start, rows = 0, len(values[0])
+        while start < rows:
+            if batch is None:
+                batch = ColumnarBatch(schema)
+            end = min(rows, start + batch_rows - batch.num_rows)
+            for column, column_values in zip(batch.columns, values):
+                column.extend(column_values if (start, end) == (0, rows) else column_values[start:end])
+            start = end
+            if batch.num_rows >= batch_rows:
+                yield batch
+                batch = None
+    if batch is not None:
+        yield batch
+
+
+def heading_batches(scanned_files: Iterable[ScannedFile],
+                    todo_keywords: Sequence[str] = ('TODO', 'NEXT', 'WAITING', 'DONE', 'CANCELED'),
+                    batch_rows: int = DEFAULT_BATCH_ROWS) -> Iterator[ColumnarBatch]:
+    """
+    Yields the headings of scanned files as ColumnarBatch objects with
+    at most batch_rows rows and the columns
+
+    filename: dictionary encoded string
+    offset: int64 character offset of the heading line
+    level: int64
+    keyword: dictionary encoded string; null without a keyword
+    priority: dictionary encoded string; null without a priority
+    title: string
+    tags: list of dictionary encoded strings
+    properties: map of string to string
+
+    for batch in heading_batches(scan_directory('~/org')):
+        print(batch.num_rows)
+
+    @param scanned_files: ScannedFile objects of scan_text(), scan_file() or scan_directory()
+    @param todo_keywords: keywords recognized at the beginning of heading titles
+    @param batch_rows: maximum number of rows of a batch
+    """
+
+    heading_regex = heading_title_regex(todo_keywords)
+
+    def columns(scanned_file: ScannedFile) -> Sequence[Sequence[Any]]:
+        headings = scanned_file.headings
+        # every heading title matches:
+        components = [heading_regex.match(heading.title).groups() for heading in headings]  # type: ignore[union-attr]
+        return ([scanned_file.filename] * len(headings),
+                [heading.offset for heading in headings],
+                [heading.level for heading in headings],
+                [groups[0] for groups in components],
+                [groups[1] for groups in components],
+                [groups[2] for groups in components],
+                [groups[3].split(':') if groups[3] else () for groups in components],
+                [heading.properties for heading in headings])
+
+    return _batches(HEADING_SCHEMA, map(columns, scanned_files), batch_rows)
+
+
+@functools.lru_cache(maxsize=65536)
+def _day_seconds(date: str) -> Optional[int]:
+    # seconds since 1970-01-01 of 'YYYY-MM-DD'; None for dates that do not exist
+    year, month, day = int(date[0:4]), int(date[5:7]), int(date[8:10])
+    if not OrgFormat.is_valid_date(year, month, day):
+        return None
+    return calendar.timegm((year, month, day, 0, 0, 0))
+
+
+def timestamp_batches(scanned_files: Iterable[ScannedFile],
+                      batch_rows: int = DEFAULT_BATCH_ROWS) -> Iterator[ColumnarBatch]:
+    """
+    Yields the time-stamps of scanned files as ColumnarBatch objects
+    with at most batch_rows rows and the columns
+
+    filename: dictionary encoded string
+    offset: int64 character offset of the time-stamp
+    heading_offset: int64 offset of the heading of the time-stamp; null before the first heading
+    timestamp: timestamp[s] of the wall-clock time; null for dates that do not exist
+    active: bool
+    has_time: bool
+    text: string, the time-stamp as written in the file
+
+    Unlike OrgFormat.orgmode_timestamp_to_datetime(), no datetime
+    object is created per time-stamp; each distinct date is converted
+    once.
+
+    @param scanned_files: ScannedFile objects of scan_text(), scan_file() or scan_directory()
+    @param batch_rows: maximum number of rows of a batch
+    """
+
+    def columns(scanned_file: ScannedFile) -> Sequence[Sequence[Any]]:
+        heading_offsets = [heading.offset for heading in scanned_file.headings]
+        offsets = [offset for offset, _ in scanned_file.timestamps]
+        texts = [text for _, text in scanned_file.timestamps]
+        return ([scanned_file.filename] * len(texts),
+                offsets,
+                [heading_offsets[index] if index >= 0 else None
+                 for index in [bisect.bisect_right(heading_offsets, offset) - 1 for offset in offsets]],
+                # '<YYYY-MM-DD Sun HH:MM>' as matched by OrgFormat.SINGLE_ORGMODE_TIMESTAMP:
+                [day_seconds + (int(text[-6:-4]) * 3600 + int(text[-3:-1]) * 60 if text[-4] == ':' else 0)
+                 if day_seconds is not None else None
+                 for day_seconds, text in zip([_day_seconds(text[1:11]) for text in texts], texts)],
+                [text[0] == '<' for text in texts],
+                [text[-4] == ':' for text in texts],
+                texts)
+
+    return _batches(TIMESTAMP_SCHEMA, map(columns, scanned_files), batch_rows)
+
+# Local Variables:
+# End:
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import array
+import calendar
+import datetime
+from orgformat import OrgFormat
+from orgformat.scanner import scan_text
+from orgformat.export import heading_batches, timestamp_batches, DictionaryColumn, Bitmap
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class TestExport(unittest.TestCase):
+
+    ORGTEXT = '[2020-01-01 Wed] before the first heading\n' + \
+        OrgFormat.generate_heading(level=1,
+                                   keyword='TODO',
+                                   priority='A',
+                                   title='This is my title',
+                                   tags=['work', 'urgent'],
+                                   scheduled_timestamp='<2019-12-29 Sun 11:35>',
+                                   properties=[('ID', 'foo-123'), ('CREATED', '[2011-11-03 Thu 23:59]')],
+                                   section='Some content.') + \
+        OrgFormat.generate_heading(level=2, title='second äöü', tags=['work'], section='invalid <2019-02-30 Sat>')
+
+    def scanned(self):
+        return [scan_text(self.ORGTEXT, 'a.org'), scan_text(self.ORGTEXT, 'b.org')]
+
+    def test_heading_batches(self):
+
+        batches = list(heading_batches(self.scanned()))
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batches[0].num_rows, 4)
+        columns = batches[0].to_pydict()
+        self.assertEqual(columns['filename'], ['a.org', 'a.org', 'b.org', 'b.org'])
+        self.assertEqual(columns['offset'][:2], [self.ORGTEXT.index('* TODO'), self.ORGTEXT.index('** second')])
+        self.assertEqual(columns['level'], [1, 2, 1, 2])
+        self.assertEqual(columns['keyword'], ['TODO', None, 'TODO', None])
+        self.assertEqual(columns['priority'], ['A', None, 'A', None])
+        self.assertEqual(columns['title'][:2], ['This is my title', 'second äöü'])
+        self.assertEqual(columns['tags'][:2], [['work', 'urgent'], ['work']])
+        self.assertEqual(columns['properties'][:2],
+                         [[('ID', 'foo-123'), ('CREATED', '[2011-11-03 Thu 23:59]')], []])
+
+        ## dictionary encoded: every distinct value is stored once
+        self.assertEqual(batches[0].column('filename').dictionary.to_pylist(), ['a.org', 'b.org'])
+        self.assertEqual(batches[0].column('tags').values.dictionary.to_pylist(), ['work', 'urgent'])
+        self.assertEqual(batches[0].column('tags').values.indices, array.array('i', [0, 1, 0, 0, 1, 0]))
+
+        ## files get split across batches:
+        batches = list(heading_batches(self.scanned(), batch_rows=3))
+        self.assertEqual([batch.num_rows for batch in batches], [3, 1])
+        self.assertEqual(batches[0].to_pydict()['tags'] + batches[1].to_pydict()['tags'], columns['tags'])
+        self.assertEqual(list(heading_batches([])), [])
+
+    def test_timestamp_batches(self):
+
+        batch, = timestamp_batches(self.scanned())
+        columns = batch.to_pydict()
+        self.assertEqual(columns['text'][:4], ['[2020-01-01 Wed]', '<2019-12-29 Sun 11:35>',
+                                               '[2011-11-03 Thu 23:59]', '<2019-02-30 Sat>'])
+        self.assertEqual(columns['offset'][1], self.ORGTEXT.index('<2019-12-29'))
+        self.assertEqual(columns['heading_offset'][:4], [None, self.ORGTEXT.index('* TODO'),
+                                                         self.ORGTEXT.index('* TODO'),
+                                                         self.ORGTEXT.index('** second')])
+        self.assertEqual(columns['timestamp'][:4],
+                         [calendar.timegm((2020, 1, 1, 0, 0, 0)), calendar.timegm((2019, 12, 29, 11, 35, 0)),
+                          calendar.timegm((2011, 11, 3, 23, 59, 0)), None])
+        self.assertEqual(datetime.datetime.fromtimestamp(columns['timestamp'][1], datetime.timezone.utc)
+                         .replace(tzinfo=None),
+                         OrgFormat.orgmode_timestamp_to_datetime('<2019-12-29 Sun 11:35>'))
+        self.assertEqual(columns['active'][:4], [False, True, False, True])
+        self.assertEqual(columns['has_time'][:4], [False, True, True, False])
+        self.assertEqual(len(columns['text']), 8)
+
+    def test_columns(self):
+
+        bitmap = Bitmap()
+        bitmap.extend([index % 3 == 0 for index in range(10)])
+        bitmap.extend_set(3)
+        self.assertEqual(bitmap.to_bytearray(), bytearray([0b01001001, 0b00011110]))
+        self.assertEqual(bitmap.unset, [1, 2, 4, 5, 7, 8])
+        self.assertEqual([bitmap[index] for index in range(4)], [True, False, False, True])
+
+        column = DictionaryColumn()
+        column.extend(['a', None, 'b'])
+        column.extend(['a'])
+        self.assertEqual(column.to_pylist(), ['a', None, 'b', 'a'])
+        self.assertEqual(column.indices, array.array('i', [0, 0, 1, 0]))
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_to_arrow(self):
+
+        headings, = heading_batches(self.scanned())
+        record_batch = headings.to_arrow()
+        self.assertEqual(record_batch.schema.names, headings.names)
+        self.assertEqual(record_batch.schema.field('keyword').type,
+                         pyarrow.dictionary(pyarrow.int32(), pyarrow.string()))
+        self.assertEqual(record_batch.column('keyword').to_pylist(), ['TODO', None, 'TODO', None])
+        self.assertEqual(record_batch.column('tags').to_pylist()[:2], [['work', 'urgent'], ['work']])
+        self.assertEqual(record_batch.column('properties').to_pylist()[0],
+                         [('ID', 'foo-123'), ('CREATED', '[2011-11-03 Thu 23:59]')])
+
+        ## the Arrow arrays share the memory of the columns:
+        offsets = headings.column('offset').values
+        self.assertEqual(record_batch.column('offset').buffers()[1].address, offsets.buffer_info()[0])
+
+        timestamps, = timestamp_batches(self.scanned())
+        record_batch = timestamps.to_arrow()
+        self.assertEqual(record_batch.column('timestamp').to_pylist()[:4],
+                         [datetime.datetime(2020, 1, 1), datetime.datetime(2019, 12, 29, 11, 35),
+                          datetime.datetime(2011, 11, 3, 23, 59), None])
+        self.assertEqual(record_batch.column('active').to_pylist(), timestamps.to_pydict()['active'])
+        self.assertEqual(record_batch.to_pydict()['heading_offset'], timestamps.to_pydict()['heading_offset'])
+
+
+# Local Variables:
+# End:
@@ -7,13 +7,82 @@ import datetime
 import calendar
 import logging
 import re
-from typing import List, Union, Tuple, Optional  # mypy: type checks
+import functools
+import mailbox
+import mmap
+import email.header
+import email.parser
+import email.errors
+import email.utils
+import io
+import hashlib
+import collections
+import itertools
+import threading
+from typing import List, Union, Tuple, Optional, Iterable, Iterator, Sequence, TextIO, Any, Dict, Callable, NamedTuple, TypeVar  # mypy: type checks
+
+# Safe for threads and free-threaded (no-GIL) CPython builds: parsing
+# does not use time.strptime() which serializes all threads on a
+# module-wide lock, and shared mutable state such as the caches of
+# HeadingRenderCache and OrgFormatProfiler is protected by own locks.
+# Only OrgFormatProfiler.enable() and disable() replace the methods of
+# OrgFormat and should not run while other threads use OrgFormat.
+
+SortItem = TypeVar('SortItem')
+
+# buffers the *_from_buffer() functions of OrgFormat parse without decoding them:
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+# an Org mode heading line: its asterisks and the rest of the line
+# (see heading_title_regex()); used by all modules reading headings:
+HEADING_REGEX = re.compile(r'^(\*+)[ \t]+(.*?)[ \t]*$', re.MULTILINE)
+HEADING_BYTES_REGEX = re.compile(HEADING_REGEX.pattern.encode('ascii'), re.MULTILINE)
+
+
+def heading_title_regex(todo_keywords: Sequence[str]) -> 're.Pattern[str]':
+    """
+    Returns a regular expression splitting the rest of a heading line
+    (group 2 of HEADING_REGEX) into the keyword, the priority, the
+    title and the tags separated by colons (groups 1 to 4). It
+    matches every such string.
+
+    @param todo_keywords: keywords recognized at the beginning of the title
+    """
+
+    return re.compile(r'(?:(' + '|'.join(re.escape(keyword) for keyword in todo_keywords) + r')(?:[ \t]+|$))?' +
+                      r'(?:\[#(.)\][ \t]*)?' +
+                      r'(.*?)' +
+                      r'(?:[ \t]+:([\w@#%:]+):)?[ \t]*$')
+
+
+def _month_weekdays(first_year: int, last_year: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Returns the calendar table of OrgFormat.weekday(): the weekday of
+    each day of a month at the index of the day (index 0 is unused),
+    indexed by year * 13 + month. Month 0 and the years before
+    first_year hold empty tuples. Months starting on the same weekday
+    with the same number of days share their tuple.
+    """
+
+    months: List[Tuple[int, ...]] = [()] * (first_year * 13)
+    shared: Dict[Tuple[int, int], Tuple[int, ...]] = {}
+    month_days = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+    weekday = datetime.date(first_year, 1, 1).weekday()
+    for year in range(first_year, last_year + 1):
+        months.append(())
+        for month in range(1, 13):
+            days = month_days[month] + (month == 2 and calendar.isleap(year))
+            if (weekday, days) not in shared:
+                shared[weekday, days] = (-1,) + tuple((weekday + day) % 7 for day in range(days))
+            months.append(shared[weekday, days])
+            weekday = (weekday + days) % 7
+    return tuple(months)
 
 
 class TimestampParseException(Exception):
     """
     Own exception should be raised when
-    strptime fails
+    parsing a date or time fails
     """
 
     def __init__(self, value: Union[ValueError, str]) -> None:
@@ -23,6 +92,192 @@ class TimestampParseException(Exception):
         return repr(self.value)
 
 
+class PropertyDrawer(object):
+    """
+    Ordered collection of the properties of an Org mode property
+    drawer with O(1) lookups. Property names are case-insensitive
+    as in Org mode but keep their spelling for the output.
+
+    drawer = PropertyDrawer.parse(':PROPERTIES:\\n:ID: foo\\n:END:\\n')
+    drawer['id']
+    -> 'foo'
+
+    drawer['CREATED'] = '[2011-11-03 Thu 23:59]'
+    str(drawer)
+    -> ':PROPERTIES:\\n:ID: foo\\n:CREATED: [2011-11-03 Thu 23:59]\\n:END:\\n'
+
+    The output is identical to the drawer OrgFormat.generate_heading()
+    emits which also accepts a PropertyDrawer as properties.
+    """
+
+    PROPERTY_LINE_REGEX = re.compile(r'^[ \t]*:(\S+?):(?:[ \t]+(.*?))?[ \t]*$')
+
+    # headings and ID/CUSTOM_ID property lines (group 3) found by PropertyDrawer.id_index()
+    ID_INDEX_REGEX = re.compile(HEADING_REGEX.pattern + r'|^[ \t]*:(?:ID|CUSTOM_ID):[ \t]+(.*?)[ \t]*$',
+                                re.MULTILINE | re.IGNORECASE)
+    ID_INDEX_BYTES_REGEX = re.compile(ID_INDEX_REGEX.pattern.encode('ascii'),
+                                      re.MULTILINE | re.IGNORECASE)
+
+    def __init__(self, properties: Optional[Iterable[Tuple[str, str]]] = None) -> None:
+        # upper case name -> (name, value)
+        self._properties: Dict[str, Tuple[str, str]] = {}
+        if properties:
+            self.merge(properties)
+
+    @staticmethod
+    def parse(text: str) -> 'PropertyDrawer':
+        """
+        Returns the first property drawer within the given text which
+        may be a single drawer or a whole heading.
+
+        @param text: string containing a :PROPERTIES: ... :END: drawer
+        @param return: PropertyDrawer; empty if text does not contain a drawer
+        """
+
+        drawer = PropertyDrawer()
+        lines = iter(text.splitlines())
+        for line in lines:
+            if line.strip() == ':PROPERTIES:':
+                break
+        else:
+            return drawer
+
+        for line in lines:
+            stripped = line.strip()
+            if stripped == ':END:':
+                return drawer
+            components = PropertyDrawer.PROPERTY_LINE_REGEX.match(line)
+            if not components:
+                raise ValueError('invalid line within property drawer: "' + line + '"')
+            drawer[components.group(1)] = components.group(2) or ''
+        raise ValueError('property drawer is missing its :END: line')
+
+    @staticmethod
+    def id_index(text: str) -> Dict[str, int]:
+        """
+        Returns a dict mapping all :ID: and :CUSTOM_ID: values within
+        the given Org mode text to the offset of the beginning of the
+        heading they belong to. Properties before the first heading
+        map to 0.
+
+        PropertyDrawer.id_index('* foo\\n:PROPERTIES:\\n:ID: 123\\n:END:\\n')
+        -> {'123': 0}
+
+        The text is scanned once with a single regular expression. ID
+        lines are not checked to be within a drawer.
+
+        @param text: content of an Org mode file
+        @param return: dict of ID -> character offset
+        """
+
+        index: Dict[str, int] = {}
+        heading_offset = 0
+        for components in PropertyDrawer.ID_INDEX_REGEX.finditer(text):
+            if components.group(1):
+                heading_offset = components.start()
+            else:
+                index[components.group(3)] = heading_offset
+        return index
+
+    @staticmethod
+    def id_index_of_file(filename: str, encoding: str = 'utf-8') -> Dict[str, int]:
+        """
+        Same as PropertyDrawer.id_index() for a file. The offsets are
+        byte offsets which can be used with seek() directly. The file
+        is not decoded as a whole, only the ID values are.
+
+        @param filename: path to an Org mode file
+        @param encoding: encoding of the ID values
+        @param return: dict of ID -> byte offset
+        """
+
+        with open(filename, 'rb') as orgfile:
+            content = orgfile.read()
+        index: Dict[str, int] = {}
+        heading_offset = 0
+        for components in PropertyDrawer.ID_INDEX_BYTES_REGEX.finditer(content):
+            if components.group(1):
+                heading_offset = components.start()
+            else:
+                index[components.group(3).decode(encoding)] = heading_offset
+        return index
+
+    def merge(self, other: Union['PropertyDrawer', Iterable[Tuple[str, str]]],
+              overwrite: bool = True) -> 'PropertyDrawer':
+        """
+        Adds the properties of other. New properties are appended,
+        existing ones keep their position.
+
+        @param other: PropertyDrawer or iterable of name/value tuples
+        @param overwrite: if False, values of existing properties are kept
+        @param return: self
+        """
+
+        if isinstance(other, PropertyDrawer):
+            other = other.items()
+        for name, value in other:
+            if overwrite or name.upper() not in self._properties:
+                self[name] = value
+        return self
+
+    def items(self) -> List[Tuple[str, str]]:
+        """
+        Returns the name/value tuples in drawer order as used by
+        the properties parameter of OrgFormat.generate_heading().
+        """
+        return list(self._properties.values())
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        entry = self._properties.get(name.upper())
+        return entry[1] if entry else default
+
+    def __getitem__(self, name: str) -> str:
+        return self._properties[name.upper()][1]
+
+    def __setitem__(self, name: str, value: str) -> None:
+        key = name.upper()
+        entry = self._properties.get(key)
+        # keep the spelling of an existing property:
+        self._properties[key] = (entry[0] if entry else name, value)
+
+    def __delitem__(self, name: str) -> None:
+        del self._properties[name.upper()]
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and name.upper() in self._properties
+
+    def __len__(self) -> int:
+        return len(self._properties)
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name, value in self._properties.values())
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, PropertyDrawer) and self.items() == other.items()
+
+    def __repr__(self) -> str:
+        return 'PropertyDrawer(' + repr(self.items()) + ')'
+
+    def __str__(self) -> str:
+        if not self._properties:
+            return ''
+        return ':PROPERTIES:\n' + \
+            ''.join(':' + name + ': ' + value + '\n' for name, value in self._properties.values()) + \
+            ':END:\n'
+
+
+class ExtractedDatetime(NamedTuple):
+    """
+    A date or date and time found by OrgFormat.extract_datetimes().
+    """
+
+    start: int
+    end: int
+    text: str
+    struct_time: time.struct_time
+    has_time: bool
+
+
 class OrgFormat(object):
     """
     Utility library for providing functions to generate and modify Org
@@ -46,6 +301,52 @@ class OrgFormat(object):
     ISODATETIME_REGEX = re.compile(r'([12]\d\d\d-[012345]\d?-([012345]\d?))' +
                                    r'([T ]((\d\d?[:.][012345]\d?)([:.][012345]\d?)?))?')
 
+    # finds ISO 8601 dates and times in the extended format (see
+    # ISODATETIME_REGEX) or the basic format (YYYYMMDD(THHMMSS(Z)?)?)
+    # anywhere within a text but not within longer runs of digits:
+    DATETIME_EXTRACTION_REGEX = re.compile(
+        r'(?<!\d)(?:' +
+        r'([12]\d\d\d)-(0?[1-9]|1[012])-(0?[1-9]|[12]\d|3[01])(?!\d)' +
+        r'(?:[T ]([01]?\d|2[0123])[:.]([012345]\d?)(?:[:.]([012345]\d?))?(?!\d))?' +
+        r'|' +
+        r'([12]\d\d\d)(0[1-9]|1[012])(0[1-9]|[12]\d|3[01])' +
+        r'(?:T([01]\d|2[0123])([012345]\d)([012345]\d)(Z)?)?(?!\d))')
+
+    # calendar lookup table covering the years of SINGLE_ORGMODE_TIMESTAMP,
+    # MONTH_WEEKDAYS[year * 13 + month][day] is the weekday (Monday is 0):
+    CALENDAR_FIRST_YEAR = 1000
+    CALENDAR_LAST_YEAR = 2999
+    MONTH_WEEKDAYS = _month_weekdays(CALENDAR_FIRST_YEAR, CALENDAR_LAST_YEAR)
+    # days of a common year before the first day of the month:
+    DAYS_BEFORE_MONTH = (0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+    # ISO 8601 basic format as accepted by parse_basic_iso_datetime();
+    # the same patterns as time.strptime() uses for %Y, %m, %d, %H, %M
+    # and %S, so unpadded fields and all Unicode digits are accepted:
+    BASIC_ISODATETIME_REGEX = re.compile(r'(\d\d\d\d)(1[0-2]|0[1-9]|[1-9])(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])' +
+                                         r'(?:T(2[0-3]|[0-1]\d|\d)([0-5]\d|\d)(6[0-1]|[0-5]\d|\d)(Z)?)?',
+                                         re.IGNORECASE)
+    ISO_UTC_DATETIME_REGEX = re.compile(r'(\d\d\d\d)-(1[0-2]|0[1-9]|[1-9])-(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])' +
+                                        r'T(2[0-3]|[0-1]\d|\d):([0-5]\d|\d):(6[0-1]|[0-5]\d|\d)Z',
+                                        re.IGNORECASE)
+
+    # the keys of timestamp_sort_key(): date, optional time and '!'
+    # for active or '"' for inactive (both sort before the digits):
+    TIMESTAMP_SORT_KEY_REGEX = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}(?:[0-9]{2}:[0-9]{2})?[!"]$')
+
+    # the same for bytes-like buffers:
+    SINGLE_ORGMODE_TIMESTAMP_BYTES_REGEX = re.compile(SINGLE_ORGMODE_TIMESTAMP.encode('ascii'))
+    ORGMODE_TIMESTAMP_BYTES_REGEX = re.compile((SINGLE_ORGMODE_TIMESTAMP + "$").encode('ascii'))
+    ISODATETIME_BYTES_REGEX = re.compile(ISODATETIME_REGEX.pattern.encode('ascii'))
+
+    # Org mode link escaping (see org-link-escape): square brackets
+    # get a leading backslash and backslashes are doubled only when
+    # they precede a square bracket or the end of the link.
+    LINK_ESCAPE_REGEX = re.compile(r'(\\*)([][]|\Z)')
+
+    # Org mode separates "]]" within link descriptions with a zero width space:
+    LINK_DESCRIPTION_ESCAPE_REGEX = re.compile(r'\](?=\]|\Z)')
+
     @staticmethod
     def orgmode_timestamp_to_datetime(orgtime: str) -> datetime.datetime:
         """
@@ -70,6 +371,43 @@ class OrgFormat(object):
                                           "HH:MM>\" (including inactive ones): \"" +
                                           orgtime + "\"")
 
+        return OrgFormat._timestamp_components_to_datetime(components)
+
+    @staticmethod
+    def orgmode_timestamp_to_datetime_from_buffer(buffer: Buffer, start: int = 0,
+                                                  end: Optional[int] = None) -> datetime.datetime:
+        """
+        Same as OrgFormat.orgmode_timestamp_to_datetime() for the
+        time-stamp located at buffer[start:end] of a bytes-like buffer
+        such as bytes, memoryview or mmap. The buffer is neither decoded
+        nor copied.
+
+        OrgFormat.orgmode_timestamp_to_datetime_from_buffer(b'SCHEDULED: <1980-12-31 Wed 23:59>', 11)
+        -> datetime.datetime(1980, 12, 31, 23, 59, 0, tzinfo=None)
+
+        @param buffer: bytes-like object containing ASCII compatible encoded text
+        @param start: offset of the time-stamp within buffer
+        @param end: offset after the time-stamp; default is the end of buffer
+        @param return: date time object
+        """
+
+        if end is None:
+            end = len(buffer)
+        components = OrgFormat.ORGMODE_TIMESTAMP_BYTES_REGEX.match(buffer, start, end)
+        if not components:
+            raise TimestampParseException("buffer could not be parsed as " +
+                                          "time-stamp of format \"<YYYY-MM-DD Sun " +
+                                          "HH:MM>\" (including inactive ones): " +
+                                          repr(bytes(buffer[start:min(end, start + 80)])))
+        return OrgFormat._timestamp_components_to_datetime(components)
+
+    @staticmethod
+    def _timestamp_components_to_datetime(components: re.Match[Any]) -> datetime.datetime:
+        """
+        Returns the datetime of a match of ORGMODE_TIMESTAMP_REGEX or
+        ORGMODE_TIMESTAMP_BYTES_REGEX; int() handles str and bytes alike.
+        """
+
         year = int(components.group(2))
         month = int(components.group(3))
         day = int(components.group(4))
@@ -78,6 +416,117 @@ class OrgFormat(object):
 
         return datetime.datetime(year, month, day, hour, minute, 0)
 
+    @staticmethod
+    def find_orgmode_timestamps_in_buffer(buffer: Buffer, start: int = 0,
+                                          end: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """
+        Yields the start and end offsets of all Org mode time-stamps
+        within buffer[start:end] of a bytes-like buffer. The offsets can
+        be handed to OrgFormat.orgmode_timestamp_to_datetime_from_buffer().
+
+        list(OrgFormat.find_orgmode_timestamps_in_buffer(b'foo <1980-12-31 Wed> bar [2011-11-03 Thu 23:59]'))
+        -> [(4, 20), (25, 47)]
+
+        @param buffer: bytes-like object containing ASCII compatible encoded text
+        @param start: offset to start searching from
+        @param end: offset to stop searching at; default is the end of buffer
+        @param return: iterator of (start, end) offsets
+        """
+
+        if end is None:
+            end = len(buffer)
+        for components in OrgFormat.SINGLE_ORGMODE_TIMESTAMP_BYTES_REGEX.finditer(buffer, start, end):
+            yield components.span()
+
+    @staticmethod
+    def timestamp_sort_key(orgtime: str) -> str:
+        """
+        Returns a string which sorts Org mode date- or time-stamps
+        chronologically without parsing them into datetime objects.
+
+        Date-stamps sort before time-stamps of the same day. On equal
+        date and time, active time-stamps sort before inactive ones.
+        Only the first time-stamp of a range and the begin of a time
+        range like '<2019-12-29 Sun 10:00-11:00>' are considered.
+
+        OrgFormat.timestamp_sort_key('<2019-12-29 Sun 9:05>')
+        -> '2019-12-2909:05!'
+
+        The digits are taken from their fixed positions; only that
+        they are digits is checked, not whether they form a valid date.
+
+        @param orgtime: '<YYYY-MM-DD Sun HH:MM>' or similar, active or inactive
+        @param return: string sort key
+        """
+
+        try:
+            if orgtime[0] == '<':
+                closing = orgtime.find('>', 11)
+                flag = '!'
+            elif orgtime[0] == '[':
+                closing = orgtime.find(']', 11)
+                flag = '"'
+            else:
+                closing, flag = -1, ''
+            colon = orgtime.find(':', 11, closing)
+            if colon == -1:
+                key = orgtime[1:11] + flag
+            elif orgtime[colon - 2] == ' ':
+                key = orgtime[1:11] + '0' + orgtime[colon - 1:colon + 3] + flag
+            else:
+                key = orgtime[1:11] + orgtime[colon - 2:colon + 3] + flag
+        except IndexError:
+            closing = -1
+        if closing == -1 or not OrgFormat.TIMESTAMP_SORT_KEY_REGEX.match(key):
+            raise TimestampParseException('string could not be parsed as ' +
+                                          'time-stamp of format "<YYYY-MM-DD Sun ' +
+                                          'HH:MM>" (including inactive ones): "' +
+                                          orgtime + '"')
+        return key
+
+    @staticmethod
+    def sort_by_timestamp(items: Iterable[SortItem],
+                          key: Optional[Callable[[SortItem], Optional[str]]] = None,
+                          reverse: bool = False) -> List[SortItem]:
+        """
+        Returns the items sorted chronologically by their Org mode
+        date- or time-stamps using OrgFormat.timestamp_sort_key().
+        The sort key is computed only once per item.
+
+        OrgFormat.sort_by_timestamp(['<2019-12-30 Mon>', '[2019-12-29 Sun 11:35]'])
+        -> ['[2019-12-29 Sun 11:35]', '<2019-12-30 Mon>']
+
+        OrgFormat.sort_by_timestamp(headings, key=lambda heading: heading.scheduled)
+
+        @param items: time-stamp strings or arbitrary items with a key function
+        @param key: optional function returning the time-stamp of an item;
+                    items without a time-stamp (None or '') are put at the end
+        @param reverse: if True, sort in descending order (still with
+                        the items without time-stamp at the end)
+        @param return: new sorted list
+        """
+
+        sort_key = OrgFormat.timestamp_sort_key
+
+        if key is None:
+            # without a wrapper function per item:
+            items = list(items)
+            orgtimes: List[Any] = [item for item in items if item]
+            result = sorted(orgtimes, key=sort_key, reverse=reverse)
+            if len(result) < len(items):
+                result.extend(item for item in items if not item)
+            return result
+
+        get_timestamp = key
+        # sorts after (or, reversed, before) all keys:
+        missing = '' if reverse else '\uffff'
+
+        def item_key(item: Any) -> str:
+            orgtime = get_timestamp(item)
+            return sort_key(orgtime) if orgtime else missing
+
+        return sorted(items, key=item_key, reverse=reverse)
+
     @staticmethod
     def apply_timedelta_to_org_timestamp(orgtime: str, deltahours: Union[int, float]) -> str:
         """
@@ -154,6 +603,79 @@ class OrgFormat(object):
         assert isinstance(tuple_date, datetime.datetime)
         return tuple_date.timetuple()
 
+    @staticmethod
+    def is_valid_date(year: int, month: int, day: int,
+                      _first_year: int = CALENDAR_FIRST_YEAR,
+                      _last_year: int = CALENDAR_LAST_YEAR,
+                      _month_weekdays: Tuple[Tuple[int, ...], ...] = MONTH_WEEKDAYS) -> bool:
+        """
+        Returns True if the date exists.
+
+        OrgFormat.is_valid_date(2019, 2, 29)
+        -> False
+
+        Within CALENDAR_FIRST_YEAR and CALENDAR_LAST_YEAR, only integer
+        arithmetic and table lookups are used. The parameters starting
+        with an underscore bind the table to locals and must not be given.
+        """
+
+        if _first_year <= year <= _last_year and 0 < month < 13:
+            return 0 < day < len(_month_weekdays[year * 13 + month])
+        try:
+            datetime.date(year, month, day)
+            return True
+        except (ValueError, OverflowError):
+            return False
+
+    @staticmethod
+    def weekday(year: int, month: int, day: int,
+                _first_year: int = CALENDAR_FIRST_YEAR,
+                _last_year: int = CALENDAR_LAST_YEAR,
+                _month_weekdays: Tuple[Tuple[int, ...], ...] = MONTH_WEEKDAYS,
+                _date: Callable[[int, int, int], datetime.date] = datetime.date) -> int:
+        """
+        Returns the day of the week of a date with Monday being 0 like
+        datetime.date.weekday() and time.struct_time.tm_wday.
+
+        OrgFormat.weekday(2013, 4, 3)
+        -> 2
+
+        Within CALENDAR_FIRST_YEAR and CALENDAR_LAST_YEAR, the weekday
+        is a single lookup in MONTH_WEEKDAYS; other years and invalid
+        dates fall back to datetime.date. The parameters starting with
+        an underscore bind the table to locals and must not be given.
+
+        @param return: 0 (Monday) to 6 (Sunday)
+        @raise ValueError: if the date does not exist
+        """
+
+        if _first_year <= year <= _last_year and 0 < month < 13 and day > 0:
+            try:
+                return _month_weekdays[year * 13 + month][day]
+            except IndexError:
+                pass  # the day does not exist in this month; datetime.date raises
+        return _date(year, month, day).weekday()
+
+    @staticmethod
+    def _struct_time(year: int, month: int, day: int,
+                     hour: int = 0, minute: int = 0, second: int = 0) -> time.struct_time:
+        """
+        Returns the same time.struct_time as time.strptime() does for
+        the given components, including the checks of their ranges.
+
+        Unlike time.strptime(), which serializes all threads on a
+        module-wide lock, this uses no shared mutable state.
+
+        @raise ValueError: if the date or time does not exist
+        """
+
+        if not (0 <= hour < 24 and 0 <= minute < 60 and 0 <= second <= 61):
+            # same ranges as %H, %M and %S of time.strptime()
+            raise ValueError('time is out of range')
+        weekday = OrgFormat.weekday(year, month, day)
+        yearday = OrgFormat.DAYS_BEFORE_MONTH[month] + day + (month > 2 and calendar.isleap(year))
+        return time.struct_time((year, month, day, hour, minute, second, weekday, yearday, -1))
+
     @staticmethod
     def fix_struct_time_wday(tuple_date: time.struct_time) -> time.struct_time:
         """
@@ -167,14 +689,12 @@ class OrgFormat(object):
         """
 
         assert isinstance(tuple_date, time.struct_time)
-        datetimestamp = OrgFormat.struct_time_to_datetime(tuple_date)
-        return time.struct_time((datetimestamp.year,
-                                 datetimestamp.month,
-                                 datetimestamp.day,
-                                 datetimestamp.hour,
-                                 datetimestamp.minute,
-                                 datetimestamp.second,
-                                 datetimestamp.weekday(),
+        year, month, day, hour, minute, second, _, _, _ = tuple_date
+        if not (0 <= hour < 24 and 0 <= minute < 60 and 0 <= second < 60):
+            # same check as datetime.datetime() does
+            raise ValueError('time is out of range')
+        return time.struct_time((year, month, day, hour, minute, second,
+                                 OrgFormat.weekday(year, month, day),
                                  0, 0))
 
     @staticmethod
@@ -200,11 +720,20 @@ class OrgFormat(object):
         assert (tuple_date.__class__ ==
                 time.struct_time or tuple_date.__class__ == datetime.datetime)
 
-        local_structtime = None  # : time.struct_time   # Variable annotation syntax is only supported in Python 3.6 and greater
+        local_structtime: Union[time.struct_time, Tuple[int, int, int, int, int, int, int, int, int]]
 
         if isinstance(tuple_date, time.struct_time):
-            # fix day of week in struct_time
-            local_structtime = OrgFormat.fix_struct_time_wday(tuple_date)
+            # fix day of week in struct_time; most struct_time values
+            # (e.g., from time.strptime()) are correct already:
+            year, month, day, hour, minute, second, tm_wday, _, _ = tuple_date
+            weekday = OrgFormat.weekday(year, month, day)
+            if tm_wday == weekday:
+                local_structtime = tuple_date
+            else:
+                # same as fix_struct_time_wday() but as a plain tuple
+                # which strftime() accepts as well and which is much
+                # cheaper to create; strftime() checks the time
+                local_structtime = (year, month, day, hour, minute, second, weekday, 0, 0)
         else:
             # convert datetime to struc_time
             local_structtime = OrgFormat.datetime_to_struct_time(tuple_date)
@@ -307,9 +836,7 @@ class OrgFormat(object):
             if components.group(1) and components.group(5):
                 # found %Y-%m-%d %H:%M  ; don't care about the seconds
                 try:
-                    tuple_date = time.strptime(components.group(1) + 'T' +
-                                               components.group(5).replace(':', '.'),
-                                               "%Y-%m-%dT%H.%M")
+                    tuple_date = OrgFormat._iso_components_to_struct_time(components.groups()[:5] + (None,))
                     return OrgFormat.date(tuple_date, show_time=show_time, inactive=inactive, repeater_or_delay=repeater_or_delay)
                 except ValueError:
                     raise TimestampParseException('The provided time-stamp string does not match ' +
@@ -317,8 +844,7 @@ class OrgFormat(object):
                                                   'is an invalid date/time.')
             elif components.group(1):
                 # found %Y-%m-%d
-                tuple_date = time.strptime(components.group(1),
-                                           "%Y-%m-%d")
+                tuple_date = OrgFormat._iso_components_to_struct_time(components.groups())
                 return OrgFormat.date(tuple_date, show_time=show_time, inactive=inactive, repeater_or_delay=repeater_or_delay)
         else:
             raise TimestampParseException('The provided date string does not match ' +
@@ -326,6 +852,54 @@ class OrgFormat(object):
                                           str(date_string))
         assert False  # to satisfy mypy 0.740: "Missing return statement"
 
+    @staticmethod
+    def extract_datetimes(text: str) -> List[ExtractedDatetime]:
+        """
+        Returns all ISO 8601 like dates and times found anywhere within
+        the text such as a file name or an email subject. The extended
+        format (2021-03-04, 2021-3-4 12:34, 2021-03-04T12.34.56) and
+        the basic format (20210304, 20210304T123456, 20210304T123456Z)
+        are found in one pass of a single regular expression. Invalid
+        dates such as 2021-02-30 are skipped.
+
+        [(found.start, found.text) for found in OrgFormat.extract_datetimes('2021-03-04 Meeting notes_20210305.pdf')]
+        -> [(0, '2021-03-04'), (25, '20210305')]
+
+        OrgFormat.date(found.struct_time, show_time=found.has_time)
+        -> '<2021-03-04 Thu>'
+
+        As with OrgFormat.parse_basic_iso_datetime(), times with a
+        trailing 'Z' are converted from UTC to local time.
+
+        @param text: arbitrary text
+        @param return: list of ExtractedDatetime in order of appearance
+        """
+
+        result = []
+        for components in OrgFormat.DATETIME_EXTRACTION_REGEX.finditer(text):
+            groups = components.groups()
+            if groups[0]:
+                year, month, day, hour, minute, second = groups[0:6]
+                utc = False
+            else:
+                year, month, day, hour, minute, second = groups[6:12]
+                utc = bool(groups[12])
+            try:
+                if hour:
+                    parsed = datetime.datetime(int(year), int(month), int(day),
+                                               int(hour), int(minute), int(second or 0))
+                else:
+                    parsed = datetime.datetime(int(year), int(month), int(day))
+            except ValueError:
+                continue  # e.g., February 30th
+            if utc:
+                struct_time = time.localtime(calendar.timegm(parsed.timetuple()))
+            else:
+                struct_time = parsed.timetuple()
+            result.append(ExtractedDatetime(components.start(), components.end(),
+                                            components.group(0), struct_time, bool(hour)))
+        return result
+
     @staticmethod
     def parse_extended_iso_datetime(datetime_string: str) -> time.struct_time:
         """
@@ -346,24 +920,54 @@ class OrgFormat(object):
 
         components = re.match(OrgFormat.ISODATETIME_REGEX, datetime_string)
         if components:
-            if components.group(1) and components.group(5) and components.group(6):
-                # found %Y-%m-%d %H:%M:%S
-                return time.strptime(components.group(1) + 'T' +
-                                     components.group(4).replace(':', '.'),
-                                     "%Y-%m-%dT%H.%M.%S")
-            if components.group(1) and components.group(5):
-                # found %Y-%m-%d %H:%M
-                return time.strptime(components.group(1) + 'T' +
-                                     components.group(5).replace(':', '.'),
-                                     "%Y-%m-%dT%H.%M")
-            elif components.group(1):
-                # found %Y-%m-%d
-                return time.strptime(components.group(1), "%Y-%m-%d")
+            return OrgFormat._iso_components_to_struct_time(components.groups())
         else:
             raise TimestampParseException('The provided date string does not match ' +
                                           'the required format for %Y-%M-%D (%H.%M(.%S)): ' +
                                           str(datetime_string))
-        assert False  # to satisfy mypy 0.740: "Missing return statement"
+
+    @staticmethod
+    def parse_extended_iso_datetime_from_buffer(buffer: Buffer, start: int = 0,
+                                                end: Optional[int] = None) -> time.struct_time:
+        """
+        Same as OrgFormat.parse_extended_iso_datetime() for the date or
+        time located at buffer[start:end] of a bytes-like buffer such as
+        bytes, memoryview or mmap. Only the matched digits get decoded.
+
+        OrgFormat.parse_extended_iso_datetime_from_buffer(b'created 2011-1-2T3:4:5', 8)
+        -> time.strptime('2011-01-02 03.04.05', '%Y-%m-%d %H.%M.%S')
+
+        @param buffer: bytes-like object containing ASCII compatible encoded text
+        @param start: offset of the date within buffer
+        @param end: offset to stop parsing at; default is the end of buffer
+        """
+
+        if end is None:
+            end = len(buffer)
+        components = OrgFormat.ISODATETIME_BYTES_REGEX.match(buffer, start, end)
+        if not components:
+            raise TimestampParseException('The provided buffer does not match ' +
+                                          'the required format for %Y-%M-%D (%H.%M(.%S)): ' +
+                                          repr(bytes(buffer[start:min(end, start + 80)])))
+        return OrgFormat._iso_components_to_struct_time(
+            tuple(group.decode('ascii') if group else None for group in components.groups()))
+
+    @staticmethod
+    def _iso_components_to_struct_time(groups: Tuple[Optional[str], ...]) -> time.struct_time:
+        """
+        Returns the struct_time of the groups of a match of ISODATETIME_REGEX.
+        """
+
+        date, hours_minutes, seconds = groups[0], groups[4], groups[5]
+        assert date  # group 1 is mandatory within ISODATETIME_REGEX
+        year, month, day = date.split('-')
+        if hours_minutes:
+            # found %Y-%m-%d %H:%M(:%S)
+            hour, minute = hours_minutes.replace(':', '.').split('.')
+            return OrgFormat._struct_time(int(year), int(month), int(day), int(hour), int(minute),
+                                          int(seconds[1:]) if seconds else 0)
+        # found %Y-%m-%d
+        return OrgFormat._struct_time(int(year), int(month), int(day))
 
     @staticmethod
     def parse_basic_iso_datetime(datetime_string: str) -> time.struct_time:
@@ -383,35 +987,91 @@ class OrgFormat(object):
         assert isinstance(datetime_string, str)
         string_length = len(datetime_string)
 
-        # FIXXME: more intense checks on the datetime_string format using regex?
-
         try:
-            if string_length == 16:
-                # YYYYMMDDTHHMMSSZ
-                return time.localtime(
-                    calendar.timegm(
-                        time.strptime(datetime_string, "%Y%m%dT%H%M%SZ")))
-            elif string_length == 15:
-                # YYYYMMDDTHHMMSS
-                return time.strptime(datetime_string, "%Y%m%dT%H%M%S")
-            elif string_length == 8:
-                # YYYYMMDD
-                return time.strptime(datetime_string, "%Y%m%d")
+            if string_length in (16, 15, 8):
+                # YYYYMMDDTHHMMSSZ, YYYYMMDDTHHMMSS or YYYYMMDD
+                utc = string_length == 16
+                iso_string = datetime_string
+                components = OrgFormat.BASIC_ISODATETIME_REGEX.match(iso_string)
+                if components and (components.group(7) is not None) != utc:
+                    components = None
             elif string_length == 27:
                 # 2011-11-02T14:48:54.908371Z
-                datetime_string = datetime_string.split(".")[0] + "Z"
-                return time.localtime(
-                    calendar.timegm(
-                        time.strptime(datetime_string,
-                                      "%Y-%m-%dT%H:%M:%SZ")))
+                utc = True
+                iso_string = datetime_string.split(".")[0] + "Z"
+                components = OrgFormat.ISO_UTC_DATETIME_REGEX.match(iso_string)
             else:
                 raise TimestampParseException('datetime_string does not match expected format: ' +
                                               datetime_string)
+            # like time.strptime(), the first match has to cover the whole string:
+            if not components or components.end() != len(iso_string):
+                raise ValueError('time data %r does not match the expected format' % datetime_string)
+            tuple_date = OrgFormat._struct_time(*[int(group) for group in components.groups()[:6] if group])
+            if utc:
+                return time.localtime(calendar.timegm(tuple_date))
+            return tuple_date
         except ValueError as e:
             raise TimestampParseException(e)
 
         assert(False)  # dead code for assuring mypy that everything above is handled by a return or raising exception statement
 
+    @staticmethod
+    def parse_basic_iso_datetime_from_buffer(buffer: Buffer, start: int, end: int) -> time.struct_time:
+        """
+        Same as OrgFormat.parse_basic_iso_datetime() for the date or
+        time located at buffer[start:end] of a bytes-like buffer. Only
+        this range gets decoded.
+
+        OrgFormat.parse_basic_iso_datetime_from_buffer(b'notes_20111219.txt', 6, 14)
+        -> time.strptime('2011-12-19', '%Y-%m-%d')
+
+        @param buffer: bytes-like object containing ASCII compatible encoded text
+        @param start: offset of the date within buffer
+        @param end: offset after the date
+        """
+
+        try:
+            datetime_string = bytes(buffer[start:end]).decode('ascii')
+        except UnicodeDecodeError as e:
+            raise TimestampParseException(str(e))
+        return OrgFormat.parse_basic_iso_datetime(datetime_string)
+
+    @staticmethod
+    def escape_link(link: str, replacespaces: Optional[bool] = True) -> str:
+        """
+        Returns the link target escaped the way Org mode expects it
+        within a bracket link.
+
+        OrgFormat.escape_link('file:foo/[bar] baz.pdf')
+        -> 'file:foo/\\[bar\\]%20baz.pdf'
+
+        OrgFormat.escape_link('file:C:\\temp\\', replacespaces=False)
+        -> 'file:C:\\temp\\\\'
+
+        The usual link without brackets or backslashes is handled
+        without invoking the regular expression at all.
+
+        @param link: the link target such as 'file:foo/bar.pdf'
+        @param replacespaces: if True (default), spaces within link are being sanitized
+        @param return: the escaped link target
+        """
+
+        if '[' in link or ']' in link or '\\' in link:
+            link = OrgFormat.LINK_ESCAPE_REGEX.sub(OrgFormat._escape_link_match, link)
+        if replacespaces:
+            link = link.replace(" ", "%20")
+        return link
+
+    @staticmethod
+    def _escape_link_match(match: re.Match[str]) -> str:
+        """
+        Replacement function for OrgFormat.LINK_ESCAPE_REGEX.
+        """
+
+        if match.group(2):
+            return match.group(1) * 2 + '\\' + match.group(2)
+        return match.group(1) * 2
+
     @staticmethod
     def link(link: str, description: Optional[str] = None, replacespaces: Optional[bool] = True) -> str:
         """
@@ -428,19 +1088,49 @@ class OrgFormat(object):
         OrgFormat.link('file:foo/bar/some file.pdf', 'my description', replacespaces=False),
         -> '[[file:foo/bar/some file.pdf][my description]]'
 
+        OrgFormat.link('file:foo/[bar].pdf')
+        -> '[[file:foo/\\[bar\\].pdf]]'
+
+        Square brackets and backslashes are escaped according to
+        OrgFormat.escape_link().
+
         @param link: link to, i.e., file which should end up such as '[[file:description]]'
         @param description: optional
         @param replacespaces: if True (default), spaces within link are being sanitized
         """
 
-        if replacespaces:
-            link = link.replace(" ", "%20")
+        link = OrgFormat.escape_link(link, replacespaces)
 
         if description:
+            if ']' in description:
+                description = OrgFormat.LINK_DESCRIPTION_ESCAPE_REGEX.sub(']\u200b', description)
             return "[[" + link + "][" + description + "]]"
         else:
             return "[[" + link + "]]"
 
+    @staticmethod
+    def links(links: Iterable[Union[str, Tuple[str, Optional[str]]]],
+              replacespaces: Optional[bool] = True) -> Iterator[str]:
+        """
+        Generates Org mode links for many link targets in one pass.
+        Each item is either a link target or a tuple of link target
+        and description.
+
+        list(OrgFormat.links(['foo/bar', ('file:some file.pdf', 'my description')]))
+        -> ['[[foo/bar]]', '[[file:some%20file.pdf][my description]]']
+
+        @param links: iterable of link targets or (link, description) tuples
+        @param replacespaces: if True (default), spaces within links are being sanitized
+        @param return: iterator of Org mode links in the order of the input
+        """
+
+        link = OrgFormat.link
+        for item in links:
+            if isinstance(item, str):
+                yield link(item, None, replacespaces)
+            else:
+                yield link(item[0], item[1], replacespaces)
+
     @staticmethod
     def mailto_link(contact_mail_string: str) -> str:
         """
@@ -464,22 +1154,117 @@ class OrgFormat(object):
         @return: Org mode mailto email link
         """
 
-        delimiter = contact_mail_string.find("<")
-        if delimiter != -1:
-            name = contact_mail_string[:delimiter].strip()
-            mail = contact_mail_string[delimiter + 1:][:-1].strip()
-            if delimiter == 0:
+        name, delimiter, mail = contact_mail_string.partition("<")
+        if delimiter:
+            mail = mail[:-1].strip()
+            if name:
                 return OrgFormat.link("mailto:" + mail,
-                                      description=mail,
+                                      description=name.strip(),
                                       replacespaces=False)
             return OrgFormat.link("mailto:" + mail,
-                                  description=name,
+                                  description=mail,
                                   replacespaces=False)
         else:
             return OrgFormat.link("mailto:" + contact_mail_string,
                                   description=contact_mail_string,
                                   replacespaces=False)
 
+    @staticmethod
+    def mailto_links(contact_mail_strings: Iterable[str]) -> Iterator[str]:
+        """
+        Generates Org mode mailto email links for many contacts in one
+        pass. See OrgFormat.mailto_link() for the supported formats.
+
+        list(OrgFormat.mailto_links(['Bob Bobby <bob.bobby@example.com>', 'Bob@example.com']))
+        -> ['[[mailto:bob.bobby@example.com][Bob Bobby]]', '[[mailto:Bob@example.com][Bob@example.com]]']
+
+        @param contact_mail_strings: iterable of email information of contacts
+        @param return: iterator of Org mode mailto email links
+        """
+
+        mailto_link = OrgFormat.mailto_link
+        for contact_mail_string in contact_mail_strings:
+            yield mailto_link(contact_mail_string)
+
+    @staticmethod
+    def mailto_links_from_header(header_value: str) -> List[str]:
+        """
+        Parses an RFC 5322 address list such as the value of a To: or
+        Cc: header and generates one Org mode mailto email link per
+        address. Quoted names (even containing '<' or ','), comments
+        and RFC 2047 encoded-word names are supported.
+
+        OrgFormat.mailto_links_from_header('"Bobby, Bob" <bob@example.com>, alice@example.com')
+        -> ['[[mailto:bob@example.com][Bobby, Bob]]', '[[mailto:alice@example.com][alice@example.com]]']
+
+        OrgFormat.mailto_links_from_header('=?utf-8?q?J=C3=BCrgen?= <j@example.com>')
+        -> ['[[mailto:j@example.com][Jürgen]]']
+
+        Parsed header values are cached since the same To:/Cc: lines
+        tend to repeat within mailing list archives.
+
+        @param header_value: the (unfolded or folded) value of an address header
+        @param return: list of Org mode mailto email links
+        """
+
+        return list(OrgFormat._parse_address_header(header_value))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=8192)
+    def _parse_address_header(header_value: str) -> Tuple[str, ...]:
+        """
+        Cached worker of OrgFormat.mailto_links_from_header().
+        """
+
+        result = []
+        for name, mail in email.utils.getaddresses([header_value]):
+            if not mail:
+                continue
+            if '=?' in name:
+                try:
+                    name = str(email.header.make_header(email.header.decode_header(name)))
+                except (email.errors.HeaderParseError, LookupError, UnicodeDecodeError):
+                    pass  # keep the raw name
+            result.append(OrgFormat.link("mailto:" + mail,
+                                         description=name or mail,
+                                         replacespaces=False))
+        return tuple(result)
+
+    @staticmethod
+    def mailto_links_from_mbox(mbox_path: str,
+                               headers: Tuple[str, ...] = ('From', 'To', 'Cc')) -> Iterator[List[str]]:
+        """
+        Reads an mbox file message by message and generates the Org
+        mode mailto email links for the given address headers of each
+        message. Only the header lines of the messages are read and
+        parsed; messages are not kept in memory.
+
+        for message_links in OrgFormat.mailto_links_from_mbox('archive.mbox'):
+            print(' '.join(message_links))
+
+        @param mbox_path: path to an existing mbox file
+        @param headers: names of the address headers, in output order
+        @param return: iterator of lists of Org mode mailto email links; one list per message
+        """
+
+        parse = OrgFormat._parse_address_header
+        parser = email.parser.BytesHeaderParser()
+        mbox = mailbox.mbox(mbox_path, create=False)
+        try:
+            for key in mbox.iterkeys():
+                # the header ends with the first empty line:
+                with mbox.get_file(key) as message_file:
+                    header_lines = b''.join(itertools.takewhile(lambda line: line not in (b'\n', b'\r\n'),
+                                                                message_file))
+                message = parser.parsebytes(header_lines)
+                message_links: List[str] = []
+                for header in headers:
+                    for header_value in message.get_all(header, []):
+                        message_links.extend(parse(str(header_value)))
+                yield message_links
+        finally:
+            mbox.close()
+
     @staticmethod
     def newsgroup_link(newsgroup_string: str) -> str:
         """
@@ -551,6 +1336,156 @@ class OrgFormat(object):
         return daystring + str(hours) + ":" + str(minutes).zfill(2) + \
             ":" + str(seconds).zfill(2)
 
+    @staticmethod
+    def table_cell(value: Any) -> str:
+        """
+        Returns the text of an Org mode table cell for the given value.
+
+        time.struct_time, datetime.datetime and datetime.date values are
+        formatted with OrgFormat.date(); the time is shown only if it
+        is not midnight. None results in an empty cell. Vertical bars
+        are replaced by the entity \\vert{} and line breaks by spaces
+        so that the table structure is kept.
+
+        OrgFormat.table_cell(datetime.datetime(2011, 11, 3, 23, 59))
+        -> '<2011-11-03 Thu 23:59>'
+
+        OrgFormat.table_cell('a|b')
+        -> 'a\\vert{}b'
+
+        @param value: the content of the cell
+        @param return: the text of the cell without the surrounding bars
+        """
+
+        if value is None:
+            return ''
+        if isinstance(value, str):
+            text = value
+        elif isinstance(value, datetime.datetime):
+            text = OrgFormat.date(value, show_time=bool(value.hour or value.minute))
+        elif isinstance(value, datetime.date):
+            text = OrgFormat.date(datetime.datetime(value.year, value.month, value.day))
+        elif isinstance(value, time.struct_time):
+            text = OrgFormat.date(value, show_time=bool(value.tm_hour or value.tm_min))
+        else:
+            text = str(value)
+        if '|' in text:
+            text = text.replace('|', '\\vert{}')
+        if '\n' in text or '\r' in text:
+            text = ' '.join(text.splitlines())
+        return text
+
+    @staticmethod
+    def write_table(stream: TextIO,
+                    rows: Iterable[Optional[Sequence[Any]]],
+                    header: Optional[Sequence[Any]] = None,
+                    sample_size: Optional[int] = None) -> None:
+        """
+        Writes an aligned Org mode table row by row to the given stream.
+
+        Cells are formatted with OrgFormat.table_cell(); int and float
+        cells are right-aligned. A row of None is written as a
+        horizontal line. The header row is followed by a horizontal line.
+
+        The column widths are determined in a pre-pass:
+
+        - sample_size=None: all rows are used. A Sequence of rows is
+          iterated twice, formatting its cells in both passes, so that
+          it is not held in memory a second time. Other iterables are
+          buffered as formatted cells.
+        - sample_size=n: only the header and the first n rows are used
+          and buffered. Wider cells further down are not truncated,
+          they just break the alignment (C-c C-c in Org mode fixes it).
+
+        Apart from the two passes over a Sequence, each cell is
+        formatted only once.
+
+        OrgFormat.write_table(sys.stdout, [('foo', 1), None, ('barbaz', 23)], header=('name', 'n'))
+        | name   | n  |
+        |--------+----|
+        | foo    |  1 |
+        |--------+----|
+        | barbaz | 23 |
+
+        @param stream: a text stream such as an open file or io.StringIO
+        @param rows: iterable of rows (sequences of cell values) or None for horizontal lines
+        @param header: optional sequence of column names
+        @param sample_size: optional maximum number of rows used for the column widths
+        """
+
+        cell = OrgFormat.table_cell
+        widths: List[int] = []
+        # a formatted row: the text of each cell and whether it is right-aligned
+        FormattedRow = Optional[List[Tuple[str, bool]]]
+
+        def format_cells(row: Optional[Sequence[Any]]) -> FormattedRow:
+            if row is None:
+                return None
+            return [(cell(value), isinstance(value, (int, float)) and not isinstance(value, bool))
+                    for value in row]
+
+        def measure(row: FormattedRow) -> FormattedRow:
+            if row is not None:
+                for index, (text, _) in enumerate(row):
+                    width = len(text)
+                    if index == len(widths):
+                        widths.append(width)
+                    elif width > widths[index]:
+                        widths[index] = width
+            return row
+
+        formatted_header = measure(format_cells(header))
+        formatted_rows: Iterable[FormattedRow]
+        if sample_size is not None:
+            remaining = iter(rows)
+            sample = [measure(format_cells(row)) for row in itertools.islice(remaining, sample_size)]
+            formatted_rows = itertools.chain(sample, map(format_cells, remaining))
+        elif isinstance(rows, Sequence):
+            for row in rows:
+                measure(format_cells(row))
+            formatted_rows = map(format_cells, rows)
+        else:
+            formatted_rows = [measure(format_cells(row)) for row in rows]
+
+        hline = '|' + '+'.join('-' * (width + 2) for width in widths) + '|\n'
+
+        def write_row(row: List[Tuple[str, bool]]) -> str:
+            if len(row) < len(widths):
+                row = row + [('', False)] * (len(widths) - len(row))
+            cells = []
+            for index, (text, right_aligned) in enumerate(row):
+                width = widths[index] if index < len(widths) else 0
+                cells.append(text.rjust(width) if right_aligned else text.ljust(width))
+            return '| ' + ' | '.join(cells) + ' |\n'
+
+        write = stream.write
+        if formatted_header is not None:
+            write(write_row(formatted_header))
+            write(hline)
+        for formatted_row in formatted_rows:
+            if formatted_row is None:
+                write(hline)
+            else:
+                write(write_row(formatted_row))
+
+    @staticmethod
+    def table(rows: Iterable[Optional[Sequence[Any]]],
+              header: Optional[Sequence[Any]] = None,
+              sample_size: Optional[int] = None) -> str:
+        """
+        Returns an aligned Org mode table as a string.
+        See OrgFormat.write_table() for the parameters.
+
+        OrgFormat.table([('foo', 1), ('barbaz', 23)])
+        -> '| foo    |  1 |\\n| barbaz | 23 |\\n'
+
+        @param return: the generated Org mode table
+        """
+
+        stream = io.StringIO()
+        OrgFormat.write_table(stream, rows, header=header, sample_size=sample_size)
+        return stream.getvalue()
+
     @staticmethod
     def generate_heading(level: int,
                          keyword: Optional[str] = None,
@@ -559,7 +1494,7 @@ class OrgFormat(object):
                          tags: Optional[List[str]] = None,
                          scheduled_timestamp: Optional[str] = None,
                          deadline_timestamp: Optional[str] = None,
-                         properties: Optional[List[Tuple[str, str]]] = None,
+                         properties: Optional[Union[List[Tuple[str, str]], PropertyDrawer]] = None,
                          section: Optional[str] = None) -> str:
         """
         Returns a (potential multi-line) string with an Org mode heading that is generated
@@ -581,7 +1516,7 @@ class OrgFormat(object):
         @param tags: a list of valid tags without colons
         @param scheduled_timestamp: a string with a formatted date- or time-stamp
         @param deadline_timestamp: a string with a formatted date- or time-stamp
-        @param properties: a list of name/value tuples
+        @param properties: a list of name/value tuples or a PropertyDrawer
         @param section: the body of this heading
         @param return: the generated Org mode heading
         """
@@ -607,7 +1542,9 @@ class OrgFormat(object):
         if scheduled_timestamp or deadline_timestamp:
             result += '\n'
 
-        if properties:
+        if isinstance(properties, PropertyDrawer):
+            result += str(properties)
+        elif properties:
             result += ':PROPERTIES:\n'
             for myproperty in properties:
                 result += ':' + myproperty[0] + ': ' + myproperty[1] + '\n'
@@ -618,5 +1555,330 @@ class OrgFormat(object):
 
         return result
 
+
+class FunctionStatistics(NamedTuple):
+    """
+    Statistics of one OrgFormat function collected by OrgFormatProfiler.
+    """
+
+    calls: int
+    seconds: float
+    failures: int
+
+
+class OrgFormatProfiler(object):
+    """
+    Opt-in instrumentation of all public OrgFormat functions: call
+    counts, cumulative time and failure (exception) counts per function.
+
+    with OrgFormatProfiler() as profiler:
+        OrgFormat.strdate('2011-11-03 23:59')
+    profiler.snapshot()['strdate']
+    -> FunctionStatistics(calls=1, seconds=2.1e-05, failures=0)
+
+    While enabled, the functions of OrgFormat are replaced by measuring
+    wrappers; disable() restores the original functions. Therefore,
+    there is no overhead at all when no profiler is enabled. Wrappers
+    obtained while the profiler was enabled stop measuring after
+    disable() and only forward the call. Only one profiler can be
+    enabled at a time.
+
+    Times are inclusive: OrgFormat.strdate() also counts the time of
+    the OrgFormat.date() call it does. For generator functions such as
+    OrgFormat.links(), only the creation of the generator is measured.
+
+    @param callback: optional function called after each call with
+                     the function name, the duration in seconds and
+                     True if the call raised an exception
+    """
+
+    _active: Optional['OrgFormatProfiler'] = None
+
+    def __init__(self, callback: Optional[Callable[[str, float, bool], None]] = None) -> None:
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._statistics: Dict[str, List[Union[int, float]]] = {}
+        self._originals: Dict[str, Any] = {}
+
+    def enable(self) -> None:
+        """
+        Replaces the public OrgFormat functions with measuring wrappers.
+        """
+
+        if OrgFormatProfiler._active is not None:
+            raise RuntimeError('another OrgFormatProfiler is already enabled')
+        OrgFormatProfiler._active = self
+        for name, attribute in list(vars(OrgFormat).items()):
+            if name.startswith('_') or not isinstance(attribute, staticmethod):
+                continue
+            self._originals[name] = attribute
+            setattr(OrgFormat, name, staticmethod(self._wrap(name, attribute.__func__)))
+
+    def disable(self) -> None:
+        """
+        Restores the original OrgFormat functions. The collected
+        statistics are kept.
+        """
+
+        for name, attribute in self._originals.items():
+            setattr(OrgFormat, name, attribute)
+        self._originals = {}
+        if OrgFormatProfiler._active is self:
+            OrgFormatProfiler._active = None
+
+    def reset(self) -> None:
+        """
+        Removes all collected statistics.
+        """
+
+        with self._lock:
+            self._statistics = {}
+
+    def snapshot(self) -> Dict[str, FunctionStatistics]:
+        """
+        Returns the statistics collected so far per called function.
+        """
+
+        with self._lock:
+            return {name: FunctionStatistics(int(values[0]), float(values[1]), int(values[2]))
+                    for name, values in self._statistics.items()}
+
+    def _wrap(self, name: str, function: Callable[..., Any]) -> Callable[..., Any]:
+        perf_counter = time.perf_counter
+        lock = self._lock
+        profiler = self
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if OrgFormatProfiler._active is not profiler:
+                # kept by a caller beyond disable(), e.g. in a TimestampFormatter
+                return function(*args, **kwargs)
+            failed = True
+            start = perf_counter()
+            try:
+                result = function(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                duration = perf_counter() - start
+                with lock:
+                    values = profiler._statistics.get(name)
+                    if values is None:
+                        values = profiler._statistics[name] = [0, 0.0, 0]
+                    values[0] += 1
+                    values[1] += duration
+                    if failed:
+                        values[2] += 1
+                if profiler.callback:
+                    profiler.callback(name, duration, failed)
+
+        return wrapper
+
+    def __enter__(self) -> 'OrgFormatProfiler':
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.disable()
+
+
+class HeadingRenderCache(object):
+    """
+    Bounded cache of the results of OrgFormat.generate_heading() keyed
+    by all of its parameters. When full, the least recently used
+    headings are evicted.
+
+    cache = HeadingRenderCache(maxsize=100000)
+    cache.render(level=1, keyword='TODO', title='This is my title')
+    -> '* TODO This is my title\\n'
+
+    For skipping unchanged headings altogether, callers keep the
+    fingerprint of each heading they have written:
+
+    fingerprint, text = cache.render_if_changed(stored_fingerprint, level=1, title='This is my title')
+    if text is not None:
+        ...  # write text and store fingerprint
+
+    Fingerprints are stable hex digests of the parameters so that
+    they can be stored across runs.
+
+    @param maxsize: maximum number of cached headings
+    @param max_characters: optional maximum total length of the cached headings
+    """
+
+    def __init__(self, maxsize: int = 10000, max_characters: Optional[int] = None) -> None:
+        self.maxsize = maxsize
+        self.max_characters = max_characters
+        self.hits = 0
+        self.misses = 0
+        self._characters = 0
+        self._cache: 'collections.OrderedDict[Tuple[Any, ...], str]' = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(level: int,
+             keyword: Optional[str] = None,
+             priority: Optional[str] = None,
+             title: Optional[str] = None,
+             tags: Optional[List[str]] = None,
+             scheduled_timestamp: Optional[str] = None,
+             deadline_timestamp: Optional[str] = None,
+             properties: Optional[Union[List[Tuple[str, str]], PropertyDrawer]] = None,
+             section: Optional[str] = None) -> Tuple[Any, ...]:
+        ## empty values are left out by generate_heading() just like None:
+        if isinstance(properties, PropertyDrawer):
+            properties = properties.items()
+        return (level, keyword or None, priority or None, title or None,
+                tuple(tags) if tags else None,
+                scheduled_timestamp or None, deadline_timestamp or None,
+                tuple((name, value) for name, value in properties) if properties else None,
+                section.rstrip() if section else None)
+
+    @staticmethod
+    def fingerprint(*args: Any, **kwargs: Any) -> str:
+        """
+        Returns a hex digest of the parameters of
+        OrgFormat.generate_heading() which is the same whenever the
+        generated heading would be the same.
+        """
+
+        return hashlib.blake2b(repr(HeadingRenderCache._key(*args, **kwargs)).encode('utf-8'),
+                               digest_size=16).hexdigest()
+
+    def render(self, *args: Any, **kwargs: Any) -> str:
+        """
+        Returns OrgFormat.generate_heading() for the given parameters,
+        from the cache if possible.
+        """
+
+        key = HeadingRenderCache._key(*args, **kwargs)
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        result = OrgFormat.generate_heading(*args, **kwargs)
+
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = result
+                self._characters += len(result)
+                while self._cache and (len(self._cache) > self.maxsize or
+                                       (self.max_characters is not None and
+                                        self._characters > self.max_characters)):
+                    self._characters -= len(self._cache.popitem(last=False)[1])
+        return result
+
+    def render_if_changed(self, previous_fingerprint: Optional[str],
+                          *args: Any, **kwargs: Any) -> Tuple[str, Optional[str]]:
+        """
+        Returns the fingerprint of the parameters and the generated
+        heading, or None instead of the heading if the fingerprint
+        equals previous_fingerprint.
+        """
+
+        fingerprint = HeadingRenderCache.fingerprint(*args, **kwargs)
+        if fingerprint == previous_fingerprint:
+            return fingerprint, None
+        return fingerprint, self.render(*args, **kwargs)
+
+    def clear(self) -> None:
+        """
+        Removes all cached headings and resets the statistics.
+        """
+
+        with self._lock:
+            self._cache.clear()
+            self._characters = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class TimestampFormatter(object):
+    """
+    Formats time.struct_time or datetime.datetime values like
+    OrgFormat.date() for one fixed configuration. The template is
+    prepared once so that each call is a single string formatting.
+
+    formatter = TimestampFormatter(show_time=True, inactive=True, repeater='+1w')
+    formatter.format(datetime.datetime(2011, 11, 2, 20, 38))
+    -> '[2011-11-02 Wed 20:38 +1w]'
+
+    Unlike OrgFormat.date(), the weekday names do not depend on the
+    locale but on weekday_lang: 'en' (Mon, Tue, ...) or 'de' (Mo, Di,
+    ...) as recognized by SINGLE_ORGMODE_TIMESTAMP. The day of the
+    week of struct_time values is computed with OrgFormat.weekday(),
+    their time is not checked.
+
+    Formatters have no mutable state, so they can be shared between
+    threads, and they can be pickled for process pools.
+
+    @param show_time: show hours and minutes
+    @param inactive: (boolean) True: use inactive time-stamps; else use active ones
+    @param repeater: string holding a repeater or a delay; e.g., '+2w' or '--5d'
+    @param weekday_lang: 'en' or 'de'
+    """
+
+    WEEKDAY_NAMES = {'en': ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'),
+                     'de': ('Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So')}
+
+    def __init__(self,
+                 show_time: bool = False,
+                 inactive: bool = False,
+                 repeater: Optional[str] = None,
+                 weekday_lang: str = 'en') -> None:
+        if weekday_lang not in TimestampFormatter.WEEKDAY_NAMES:
+            raise ValueError('unsupported weekday_lang: ' + repr(weekday_lang))
+        self.show_time = show_time
+        self.inactive = inactive
+        self.repeater = repeater
+        self.weekday_lang = weekday_lang
+        self.format = self._compile()
+
+    def _compile(self) -> Callable[[Union[time.struct_time, datetime.datetime]], str]:
+        template = '%d-%02d-%02d %s'
+        if self.show_time:
+            template += ' %02d:%02d'
+        if self.repeater and self.repeater.strip():
+            template += ' ' + self.repeater.strip().replace('%', '%%')
+        template = ('[' + template + ']') if self.inactive else ('<' + template + '>')
+        names = TimestampFormatter.WEEKDAY_NAMES[self.weekday_lang]
+        weekday = OrgFormat.weekday
+        datetime_class = datetime.datetime
+
+        if self.show_time:
+            def format_time(tuple_date: Union[time.struct_time, datetime.datetime]) -> str:
+                if isinstance(tuple_date, datetime_class):
+                    return template % (tuple_date.year, tuple_date.month, tuple_date.day,
+                                       names[tuple_date.weekday()], tuple_date.hour, tuple_date.minute)
+                year, month, day, hour, minute = tuple_date[:5]
+                return template % (year, month, day, names[weekday(year, month, day)], hour, minute)
+            return format_time
+
+        def format_date(tuple_date: Union[time.struct_time, datetime.datetime]) -> str:
+            if isinstance(tuple_date, datetime_class):
+                return template % (tuple_date.year, tuple_date.month, tuple_date.day,
+                                   names[tuple_date.weekday()])
+            year, month, day = tuple_date[:3]
+            return template % (year, month, day, names[weekday(year, month, day)])
+        return format_date
+
+    def __call__(self, tuple_date: Union[time.struct_time, datetime.datetime]) -> str:
+        return self.format(tuple_date)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # the compiled function is re-created instead of pickled:
+        return (TimestampFormatter, (self.show_time, self.inactive, self.repeater, self.weekday_lang))
+
+    def __repr__(self) -> str:
+        return 'TimestampFormatter(show_time=%r, inactive=%r, repeater=%r, weekday_lang=%r)' % \
+            (self.show_time, self.inactive, self.repeater, self.weekday_lang)
+
 # Local Variables:
 # End:
@@ -5,7 +5,12 @@ import unittest
 import time
 import datetime
 import os
-from orgformat import OrgFormat, TimestampParseException
+import pickle
+import mmap
+import io
+import tempfile
+from orgformat import OrgFormat, TimestampParseException, PropertyDrawer, OrgFormatProfiler, \
+    HeadingRenderCache, TimestampFormatter
 
 
 class TestOrgFormat(unittest.TestCase):
@@ -33,6 +38,60 @@ class TestOrgFormat(unittest.TestCase):
         with self.assertRaises(TimestampParseException):
             OrgFormat.orgmode_timestamp_to_datetime('<1980-12-31 Bla>')
 
+    def test_orgmode_timestamp_to_datetime_from_buffer(self):
+        buffer = b'* foo\nSCHEDULED: <1980-12-31 Wed 23:59> [2040-01-01 Mo]\n'
+        self.assertEqual(OrgFormat.orgmode_timestamp_to_datetime_from_buffer(buffer, 17, 39),
+                         datetime.datetime(1980, 12, 31, 23, 59, 0, tzinfo=None))
+        self.assertEqual(OrgFormat.orgmode_timestamp_to_datetime_from_buffer(memoryview(buffer), 40, 55),
+                         datetime.datetime(2040, 1, 1, 0, 0, 0, tzinfo=None))
+        self.assertEqual(OrgFormat.orgmode_timestamp_to_datetime_from_buffer(b'<2040-01-01>'),
+                         datetime.datetime(2040, 1, 1, 0, 0, 0, tzinfo=None))
+        with self.assertRaises(TimestampParseException):
+            OrgFormat.orgmode_timestamp_to_datetime_from_buffer(buffer, 17)
+        with self.assertRaises(TimestampParseException):
+            OrgFormat.orgmode_timestamp_to_datetime_from_buffer(b'<1980-12-31 Bla>')
+
+        with tempfile.TemporaryFile() as orgfile:
+            orgfile.write(buffer)
+            orgfile.flush()
+            with mmap.mmap(orgfile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                self.assertEqual([OrgFormat.orgmode_timestamp_to_datetime_from_buffer(mapped, start, end)
+                                  for start, end in OrgFormat.find_orgmode_timestamps_in_buffer(mapped)],
+                                 [datetime.datetime(1980, 12, 31, 23, 59), datetime.datetime(2040, 1, 1)])
+
+    def test_find_orgmode_timestamps_in_buffer(self):
+        buffer = b'foo <1980-12-31 Wed> bar [2011-11-03 Thu 23:59] <2011-11-03 Bla>'
+        self.assertEqual(list(OrgFormat.find_orgmode_timestamps_in_buffer(buffer)), [(4, 20), (25, 47)])
+        self.assertEqual(list(OrgFormat.find_orgmode_timestamps_in_buffer(buffer, 5)), [(25, 47)])
+        self.assertEqual(list(OrgFormat.find_orgmode_timestamps_in_buffer(buffer, 0, 46)), [(4, 20)])
+
+    def test_timestamp_sort_key(self):
+        key = OrgFormat.timestamp_sort_key
+        self.assertLess(key('<2019-12-29 Sun 23:59>'), key('<2019-12-30 Mon 00:00>'))
+        self.assertLess(key('<2019-12-29 Sun>'), key('<2019-12-29 Sun 00:00>'))
+        self.assertLess(key('<2019-12-29 Sun 11:35>'), key('[2019-12-29 Sun 11:35]'))
+        self.assertLess(key('[2019-12-29 Sun 11:35]'), key('<2019-12-29 Sun 11:36>'))
+        self.assertLess(key('<2019-12-29 Sun 9:00>'), key('<2019-12-29 Sun 10:00>'))
+        self.assertEqual(key('<2019-12-29 So 11:35>'), key('<2019-12-29 11:35 +1w>'))
+        self.assertEqual(key('<2019-12-29 Sun +1w>'), key('<2019-12-29>'))
+        self.assertEqual(key('<2019-12-29 Sun 10:00-11:00>'), key('<2019-12-29 Sun 10:00>'))
+        self.assertEqual(key('<2019-12-29 Sun>--<2019-12-30 Mon 10:00>'), key('<2019-12-29 Sun>'))
+        for invalid in ['', 'foobar', '2019-12-29', '<2019-12-29 Sun', '(2019-12-29 Sun)', '<2019/12/29>',
+                        '<2019-1_-29 Sun>', '<2019-12-29 Sun +1:00>', '<２０19-12-29>']:
+            with self.assertRaises(TimestampParseException):
+                key(invalid)
+
+    def test_sort_by_timestamp(self):
+        self.assertEqual(OrgFormat.sort_by_timestamp(['<2019-12-30 Mon>', '[2019-12-29 Sun 11:35]', '<2019-12-29 Sun>']),
+                         ['<2019-12-29 Sun>', '[2019-12-29 Sun 11:35]', '<2019-12-30 Mon>'])
+        self.assertEqual(OrgFormat.sort_by_timestamp(['<2019-12-30 Mon>', '<2019-12-29 Sun>'], reverse=True),
+                         ['<2019-12-30 Mon>', '<2019-12-29 Sun>'])
+        headings = [('a', '<2019-12-30 Mon>'), ('b', None), ('c', '<2019-12-29 Sun>')]
+        self.assertEqual(OrgFormat.sort_by_timestamp(headings, key=lambda heading: heading[1]),
+                         [('c', '<2019-12-29 Sun>'), ('a', '<2019-12-30 Mon>'), ('b', None)])
+        self.assertEqual(OrgFormat.sort_by_timestamp(headings, key=lambda heading: heading[1], reverse=True),
+                         [('a', '<2019-12-30 Mon>'), ('c', '<2019-12-29 Sun>'), ('b', None)])
+
     def test_apply_timedelta_to_org_timestamp(self):
         self.assertEqual(OrgFormat.apply_timedelta_to_org_timestamp(
             '<2019-11-05 Tue 23:59>', 1), '<2019-11-06 Wed 00:59>')
@@ -79,6 +138,39 @@ class TestOrgFormat(unittest.TestCase):
 
         self.assertEqual(OrgFormat.date(OrgFormat.fix_struct_time_wday(timestamp), show_time=True, inactive=False),
                          '<2013-04-03 Wed 10:54>')
+        self.assertEqual(OrgFormat.date(timestamp, show_time=True, inactive=False),
+                         '<2013-04-03 Wed 10:54>')
+
+        with self.assertRaises(ValueError):
+            OrgFormat.fix_struct_time_wday(time.struct_time([2013, 2, 29, 10, 54, 0, 0, 0, 0]))
+        with self.assertRaises(ValueError):
+            OrgFormat.fix_struct_time_wday(time.struct_time([2013, 4, 3, 24, 54, 0, 0, 0, 0]))
+
+    def test_weekday(self):
+
+        self.assertEqual(OrgFormat.weekday(2013, 4, 3), 2)
+        self.assertEqual(OrgFormat.weekday(2000, 2, 29), 1)
+        self.assertEqual(OrgFormat.weekday(1000, 1, 1), datetime.date(1000, 1, 1).weekday())
+        self.assertEqual(OrgFormat.weekday(2999, 12, 31), datetime.date(2999, 12, 31).weekday())
+        ## outside of the lookup tables:
+        self.assertEqual(OrgFormat.weekday(1, 1, 1), 0)
+        self.assertEqual(OrgFormat.weekday(3000, 1, 1), datetime.date(3000, 1, 1).weekday())
+        date = datetime.date(1999, 12, 1)
+        while date < datetime.date(2001, 3, 1):
+            self.assertEqual(OrgFormat.weekday(date.year, date.month, date.day), date.weekday())
+            date += datetime.timedelta(days=1)
+        for invalid in [(2019, 2, 29), (2019, 4, 31), (2019, 13, 1), (2019, 0, 1), (2019, 1, 0), (3000, 2, 29)]:
+            with self.assertRaises(ValueError):
+                OrgFormat.weekday(*invalid)
+
+    def test_is_valid_date(self):
+
+        self.assertTrue(OrgFormat.is_valid_date(2000, 2, 29))
+        self.assertTrue(OrgFormat.is_valid_date(1899, 12, 30))
+        self.assertFalse(OrgFormat.is_valid_date(1900, 2, 29))
+        self.assertFalse(OrgFormat.is_valid_date(2019, 4, 31))
+        self.assertFalse(OrgFormat.is_valid_date(2019, 13, 1))
+        self.assertFalse(OrgFormat.is_valid_date(0, 1, 1))
 
     def test_date(self):
 
@@ -242,6 +334,35 @@ class TestOrgFormat(unittest.TestCase):
                          '<2011-11-30 Wed 21:06 +7y>')
 
 
+    def test_extract_datetimes(self):
+
+        found = OrgFormat.extract_datetimes('2021-03-04 Meeting notes.pdf')
+        self.assertEqual([(entry.start, entry.end, entry.text, entry.has_time) for entry in found],
+                         [(0, 10, '2021-03-04', False)])
+        self.assertEqual(OrgFormat.date(found[0].struct_time, show_time=found[0].has_time), '<2021-03-04 Thu>')
+        self.assertEqual(found[0].struct_time, OrgFormat.parse_extended_iso_datetime('2021-03-04'))
+
+        found = OrgFormat.extract_datetimes('notes_20210304.txt')
+        self.assertEqual([(entry.start, entry.text) for entry in found], [(6, '20210304')])
+        self.assertEqual(found[0].struct_time, OrgFormat.parse_basic_iso_datetime('20210304'))
+
+        found = OrgFormat.extract_datetimes('Re: meeting 2011-1-2T3:4:5 moved to 2011-11-30 21.06, see 20111219T205510')
+        self.assertEqual([entry.text for entry in found], ['2011-1-2T3:4:5', '2011-11-30 21.06', '20111219T205510'])
+        ## single digit minutes and seconds as accepted by ISODATETIME_REGEX:
+        self.assertEqual(found[0].struct_time, OrgFormat.parse_extended_iso_datetime('2011-1-2T3:4:5'))
+        self.assertEqual(OrgFormat.date(found[1].struct_time, show_time=found[1].has_time),
+                         OrgFormat.strdate('2011-11-30 21.06', show_time=True))
+        self.assertEqual(found[2].struct_time, OrgFormat.parse_basic_iso_datetime('20111219T205510'))
+
+        ## invalid dates and longer runs of digits are skipped:
+        self.assertEqual(OrgFormat.extract_datetimes('2021-02-30 120210304 2021-13-01 20210304123 foo'), [])
+        self.assertEqual([entry.text for entry in OrgFormat.extract_datetimes('2021-02-28T25:00')], ['2021-02-28'])
+
+        os.environ['TZ'] = "Europe/Vienna"
+        time.tzset()
+        found = OrgFormat.extract_datetimes('backup-20111219T205510Z.tar')
+        self.assertEqual(OrgFormat.date(found[0].struct_time, show_time=found[0].has_time), '<2011-12-19 Mon 21:55>')
+
     def test_parse_extended_iso_datetime(self):
 
         # NOTE: time.strptime() returns a time.struct_time
@@ -273,6 +394,31 @@ class TestOrgFormat(unittest.TestCase):
         self.assertEqual(OrgFormat.parse_extended_iso_datetime("2011-1-2 3.4.5"),
                          time.strptime('2011-01-02 03.04.05', '%Y-%m-%d %H.%M.%S'))
 
+    def test_parse_extended_iso_datetime_from_buffer(self):
+
+        for datetime_string in ['2011-1-2', '2011-1-2T3.4', '2011-1-2T3:4:5', '2011-1-2 3.4.5', '2011-11-30 21:06']:
+            buffer = ('created ' + datetime_string + ' foo').encode('ascii')
+            self.assertEqual(OrgFormat.parse_extended_iso_datetime_from_buffer(buffer, 8),
+                             OrgFormat.parse_extended_iso_datetime(datetime_string))
+            self.assertEqual(OrgFormat.parse_extended_iso_datetime_from_buffer(memoryview(buffer), 8),
+                             OrgFormat.parse_extended_iso_datetime(datetime_string))
+        ## end restricts the match:
+        self.assertEqual(OrgFormat.parse_extended_iso_datetime_from_buffer(b'2011-1-2T3:4:5', 0, 8),
+                         time.strptime('2011-01-02', '%Y-%m-%d'))
+        with self.assertRaises(TimestampParseException):
+            OrgFormat.parse_extended_iso_datetime_from_buffer(b'created 2011-1-2')
+
+    def test_parse_basic_iso_datetime_from_buffer(self):
+
+        self.assertEqual(OrgFormat.parse_basic_iso_datetime_from_buffer(b'notes_20111219.txt', 6, 14),
+                         time.strptime('2011-12-19', '%Y-%m-%d'))
+        self.assertEqual(OrgFormat.parse_basic_iso_datetime_from_buffer(memoryview(b'x20111219T205510y'), 1, 16),
+                         time.strptime('2011-12-19 20:55:10', '%Y-%m-%d %H:%M:%S'))
+        with self.assertRaises(TimestampParseException):
+            OrgFormat.parse_basic_iso_datetime_from_buffer(b'notes_20111219.txt', 0, 8)
+        with self.assertRaises(TimestampParseException):
+            OrgFormat.parse_basic_iso_datetime_from_buffer('2011121\u00e4'.encode('utf-8'), 0, 8)
+
     def test_parse_basic_iso_datetime(self):
 
         os.environ['TZ'] = "Europe/Vienna"
@@ -302,6 +448,12 @@ class TestOrgFormat(unittest.TestCase):
             '<1899-12-30 Sat>'
         )
 
+        ## unpadded fields as accepted by time.strptime():
+        self.assertEqual(
+            OrgFormat.date(OrgFormat.parse_basic_iso_datetime('2011-1-02T14:48:54.9083710Z'), True),
+            '<2011-01-02 Sun 15:48>'
+        )
+
         with self.assertRaises(TimestampParseException):
             OrgFormat.parse_basic_iso_datetime('foobar')
         with self.assertRaises(TimestampParseException):
@@ -320,6 +472,32 @@ class TestOrgFormat(unittest.TestCase):
                          '[[file:foo/bar/some%20file.pdf][my description]]')
         self.assertEqual(OrgFormat.link('file:foo/bar/some file.pdf', 'my description', replacespaces=False),
                          '[[file:foo/bar/some file.pdf][my description]]')
+        self.assertEqual(OrgFormat.link('file:foo/[bar].pdf'),
+                         '[[file:foo/\\[bar\\].pdf]]')
+        self.assertEqual(OrgFormat.link('foo/bar', 'my [[description]]'),
+                         '[[foo/bar][my [[description]\u200b]\u200b]]')
+
+    def test_escape_link(self):
+        self.assertEqual(OrgFormat.escape_link('file:foo/bar.pdf'), 'file:foo/bar.pdf')
+        self.assertEqual(OrgFormat.escape_link('file:foo/[bar] baz.pdf'),
+                         'file:foo/\\[bar\\]%20baz.pdf')
+        self.assertEqual(OrgFormat.escape_link('file:foo/[bar] baz.pdf', replacespaces=False),
+                         'file:foo/\\[bar\\] baz.pdf')
+        ## backslashes are only doubled in front of brackets or at the end:
+        self.assertEqual(OrgFormat.escape_link('file:C:\\temp\\foo.txt'), 'file:C:\\temp\\foo.txt')
+        self.assertEqual(OrgFormat.escape_link('file:C:\\temp\\'), 'file:C:\\temp\\\\')
+        self.assertEqual(OrgFormat.escape_link('foo\\[bar'), 'foo\\\\\\[bar')
+
+    def test_links(self):
+        self.assertEqual(list(OrgFormat.links([])), [])
+        self.assertEqual(list(OrgFormat.links(['foo/bar',
+                                               ('file:some file.pdf', 'my description'),
+                                               ('file:[x].pdf', None)])),
+                         ['[[foo/bar]]',
+                          '[[file:some%20file.pdf][my description]]',
+                          '[[file:\\[x\\].pdf]]'])
+        self.assertEqual(list(OrgFormat.links(['file:some file.pdf'], replacespaces=False)),
+                         ['[[file:some file.pdf]]'])
 
     def test_mailto_link(self):
 
@@ -331,6 +509,62 @@ class TestOrgFormat(unittest.TestCase):
                          '[[mailto:Bob@example.com][Bob@example.com]]')
         self.assertEqual(OrgFormat.mailto_link('foo bar'),
                          '[[mailto:foo bar][foo bar]]')
+        self.assertEqual(OrgFormat.mailto_link(' <Bob@example.com>'),
+                         '[[mailto:Bob@example.com]]')
+
+    def test_mailto_links(self):
+
+        self.assertEqual(list(OrgFormat.mailto_links(['Bob Bobby <bob.bobby@example.com>',
+                                                      '<Bob@example.com>',
+                                                      'Bob@example.com'])),
+                         ['[[mailto:bob.bobby@example.com][Bob Bobby]]',
+                          '[[mailto:Bob@example.com][Bob@example.com]]',
+                          '[[mailto:Bob@example.com][Bob@example.com]]'])
+
+    def test_mailto_links_from_header(self):
+
+        self.assertEqual(OrgFormat.mailto_links_from_header('Bob Bobby <bob.bobby@example.com>'),
+                         ['[[mailto:bob.bobby@example.com][Bob Bobby]]'])
+        self.assertEqual(OrgFormat.mailto_links_from_header('"Bobby, Bob" <bob@example.com>, alice@example.com'),
+                         ['[[mailto:bob@example.com][Bobby, Bob]]',
+                          '[[mailto:alice@example.com][alice@example.com]]'])
+        self.assertEqual(OrgFormat.mailto_links_from_header('"a <b> c" <abc@example.com>'),
+                         ['[[mailto:abc@example.com][a <b> c]]'])
+        self.assertEqual(OrgFormat.mailto_links_from_header('=?utf-8?q?J=C3=BCrgen?= <j@example.com>'),
+                         ['[[mailto:j@example.com][J\u00fcrgen]]'])
+        self.assertEqual(OrgFormat.mailto_links_from_header(''), [])
+        ## the cached result is not shared with the caller:
+        OrgFormat.mailto_links_from_header('alice@example.com').append('foo')
+        self.assertEqual(OrgFormat.mailto_links_from_header('alice@example.com'),
+                         ['[[mailto:alice@example.com][alice@example.com]]'])
+
+    def test_mailto_links_from_mbox(self):
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mbox_path = os.path.join(tmpdir, 'test.mbox')
+            with open(mbox_path, 'w') as mbox_file:
+                mbox_file.write('From bob@example.com Thu Nov  3 23:59:00 2011\n'
+                                'From: Bob Bobby <bob@example.com>\n'
+                                'To: alice@example.com,\n'
+                                ' "Carl, C." <carl@example.com>\n'
+                                'Subject: first\n'
+                                '\n'
+                                'body\n'
+                                '\n'
+                                'From alice@example.com Fri Nov  4 00:00:00 2011\n'
+                                'From: alice@example.com\n'
+                                'Subject: second\n'
+                                '\n'
+                                'To: not-a-header@example.com\n')
+            self.assertEqual(list(OrgFormat.mailto_links_from_mbox(mbox_path)),
+                             [['[[mailto:bob@example.com][Bob Bobby]]',
+                               '[[mailto:alice@example.com][alice@example.com]]',
+                               '[[mailto:carl@example.com][Carl, C.]]'],
+                              ['[[mailto:alice@example.com][alice@example.com]]']])
+            self.assertEqual(list(OrgFormat.mailto_links_from_mbox(mbox_path, headers=('To',))),
+                             [['[[mailto:alice@example.com][alice@example.com]]',
+                               '[[mailto:carl@example.com][Carl, C.]]'],
+                              []])
 
     def test_newsgroup_link(self):
 
@@ -354,6 +588,76 @@ class TestOrgFormat(unittest.TestCase):
         self.assertEqual(OrgFormat.dhms_from_sec(99999), '1d 3:46:39')
         self.assertEqual(OrgFormat.dhms_from_sec(12345678), '142d 21:21:18')
 
+    def test_table_cell(self):
+
+        self.assertEqual(OrgFormat.table_cell(None), '')
+        self.assertEqual(OrgFormat.table_cell(42), '42')
+        self.assertEqual(OrgFormat.table_cell('a|b\nc'), 'a\\vert{}b c')
+        self.assertEqual(OrgFormat.table_cell(datetime.datetime(2011, 11, 3, 23, 59)),
+                         '<2011-11-03 Thu 23:59>')
+        self.assertEqual(OrgFormat.table_cell(datetime.datetime(2011, 11, 3)),
+                         '<2011-11-03 Thu>')
+        self.assertEqual(OrgFormat.table_cell(datetime.date(2011, 11, 3)),
+                         '<2011-11-03 Thu>')
+        self.assertEqual(OrgFormat.table_cell(time.strptime('2011-11-03T23:59', '%Y-%m-%dT%H:%M')),
+                         '<2011-11-03 Thu 23:59>')
+        self.assertEqual(OrgFormat.table_cell(OrgFormat.link('foo/bar', 'baz')),
+                         '[[foo/bar][baz]]')
+
+    def test_table(self):
+
+        self.assertEqual(OrgFormat.table([]), '')
+        self.assertEqual(OrgFormat.table([('foo', 1), ('barbaz', 23)]),
+'''| foo    |  1 |
+| barbaz | 23 |
+''')
+        self.assertEqual(OrgFormat.table([('foo', 1), None, ('barbaz', 23)], header=('name', 'n')),
+'''| name   | n  |
+|--------+----|
+| foo    |  1 |
+|--------+----|
+| barbaz | 23 |
+''')
+        ## iterators and short rows:
+        self.assertEqual(OrgFormat.table(iter([('foo',), ('a', 'b', None)])),
+'''| foo |   |  |
+| a   | b |  |
+''')
+        ## only the first row is used for the column widths:
+        self.assertEqual(OrgFormat.table(iter([('a', 1), ('barbaz', 23)]), header=('x', 'y'), sample_size=1),
+'''| x | y |
+|---+---|
+| a | 1 |
+| barbaz | 23 |
+''')
+
+    def test_write_table(self):
+
+        stream = io.StringIO()
+        OrgFormat.write_table(stream, [(datetime.date(2011, 11, 3), 'x')], header=('date', 'foo'))
+        self.assertEqual(stream.getvalue(),
+'''| date             | foo |
+|------------------+-----|
+| <2011-11-03 Thu> | x   |
+''')
+
+        ## every cell of an iterator is formatted once, with or without
+        ## sampling; the cells of a list are formatted again instead of
+        ## being buffered:
+        class Counted(object):
+            calls = 0
+
+            def __str__(self):
+                Counted.calls += 1
+                return 'c'
+
+        for rows, sample_size, calls in [(iter, None, 2), (iter, 1, 2), (list, None, 4), (list, 1, 2)]:
+            Counted.calls = 0
+            OrgFormat.write_table(io.StringIO(), rows([(Counted(),), (Counted(),)]), sample_size=sample_size)
+            self.assertEqual(Counted.calls, calls)
+        self.assertEqual(OrgFormat.table([('foo', 1), None, ('barbaz', 23)]),
+                         OrgFormat.table(iter([('foo', 1), None, ('barbaz', 23)])))
+
     def test_generate_heading(self):
 
         ## minimal heading with all parameters provided:
@@ -442,6 +746,232 @@ SCHEDULED: <2019-12-29 Sun>
 Let's test the format here.
 ''')
 
+    def test_generate_heading_with_property_drawer(self):
+
+        drawer = PropertyDrawer([('CREATED', '[2011-11-03 Thu 23:59]'), ('myproperty', 'foo bar baz')])
+        self.assertEqual(OrgFormat.generate_heading(level=3, title='This is my title', properties=drawer),
+                         OrgFormat.generate_heading(level=3, title='This is my title', properties=drawer.items()))
+        self.assertEqual(OrgFormat.generate_heading(level=3, title='This is my title', properties=PropertyDrawer()),
+                         '*** This is my title\n')
+
+
+class TestPropertyDrawer(unittest.TestCase):
+
+    HEADING = OrgFormat.generate_heading(level=1,
+                                         title='This is my title',
+                                         properties=[('CREATED', '[2011-11-03 Thu 23:59]'),
+                                                     ('ID', 'foo-123'),
+                                                     ('empty', '')],
+                                         section='Some content.')
+
+    def test_parse(self):
+
+        drawer = PropertyDrawer.parse(self.HEADING)
+        self.assertEqual(drawer.items(), [('CREATED', '[2011-11-03 Thu 23:59]'),
+                                          ('ID', 'foo-123'),
+                                          ('empty', '')])
+        self.assertEqual(PropertyDrawer.parse('* foo\n'), PropertyDrawer())
+        self.assertEqual(PropertyDrawer.parse('  :PROPERTIES:\n  :foo:bar: baz  \n  :END:\n')['foo:bar'], 'baz')
+        with self.assertRaises(ValueError):
+            PropertyDrawer.parse(':PROPERTIES:\n:ID: foo\n')
+        with self.assertRaises(ValueError):
+            PropertyDrawer.parse(':PROPERTIES:\nfoo\n:END:\n')
+
+    def test_roundtrip(self):
+
+        drawer = PropertyDrawer.parse(self.HEADING)
+        self.assertIn(str(drawer), self.HEADING)
+        self.assertEqual(PropertyDrawer.parse(str(drawer)), drawer)
+        self.assertEqual(str(PropertyDrawer()), '')
+
+    def test_lookup_and_update(self):
+
+        drawer = PropertyDrawer.parse(self.HEADING)
+        self.assertEqual(drawer['id'], 'foo-123')
+        self.assertEqual(drawer.get('Id'), 'foo-123')
+        self.assertEqual(drawer.get('missing'), None)
+        self.assertIn('created', drawer)
+        self.assertNotIn('missing', drawer)
+        with self.assertRaises(KeyError):
+            drawer['missing']
+
+        drawer['id'] = 'bar-456'
+        drawer['NEW'] = 'value'
+        del drawer['empty']
+        self.assertEqual(list(drawer), ['CREATED', 'ID', 'NEW'])
+        self.assertEqual(len(drawer), 3)
+        self.assertEqual(str(drawer), ':PROPERTIES:\n:CREATED: [2011-11-03 Thu 23:59]\n' +
+                         ':ID: bar-456\n:NEW: value\n:END:\n')
+
+    def test_merge(self):
+
+        drawer = PropertyDrawer([('ID', 'foo'), ('A', '1')])
+        drawer.merge(PropertyDrawer([('a', '2'), ('B', '3')]))
+        self.assertEqual(drawer.items(), [('ID', 'foo'), ('A', '2'), ('B', '3')])
+        drawer.merge([('id', 'bar'), ('C', '4')], overwrite=False)
+        self.assertEqual(drawer.items(), [('ID', 'foo'), ('A', '2'), ('B', '3'), ('C', '4')])
+
+    def test_id_index(self):
+
+        text = ':PROPERTIES:\n:ID: file-id\n:END:\n' + \
+            self.HEADING + \
+            OrgFormat.generate_heading(level=2, title='second',
+                                       properties=[('CUSTOM_ID', 'my-custom-id')])
+        index = PropertyDrawer.id_index(text)
+        self.assertEqual(index, {'file-id': 0,
+                                 'foo-123': text.index('* This'),
+                                 'my-custom-id': text.index('** second')})
+        ## headings are recognized as in the scanner, the patcher and the agenda:
+        self.assertEqual(PropertyDrawer.id_index('*\tfoo\n:ID: x\n**bold** text\n:ID: y\n'), {'x': 0, 'y': 0})
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'test.org')
+            with open(filename, 'w', encoding='utf-8') as orgfile:
+                orgfile.write('* \u00e4\u00f6\u00fc\n' + text)
+            index = PropertyDrawer.id_index_of_file(filename)
+            with open(filename, 'rb') as orgfile:
+                orgfile.seek(index['my-custom-id'])
+                self.assertEqual(orgfile.readline(), b'** second\n')
+
+
+class TestOrgFormatProfiler(unittest.TestCase):
+
+    def test_profiler(self):
+
+        original_strdate = vars(OrgFormat)['strdate']
+        calls = []
+        with OrgFormatProfiler(callback=lambda name, seconds, failed: calls.append((name, failed))) as profiler:
+            self.assertIsNot(vars(OrgFormat)['strdate'], original_strdate)
+            self.assertEqual(OrgFormat.strdate('2011-11-03 23:59'), '<2011-11-03 Thu>')
+            with self.assertRaises(TimestampParseException):
+                OrgFormat.strdate('foo')
+            ## only one profiler at a time:
+            with self.assertRaises(RuntimeError):
+                OrgFormatProfiler().enable()
+
+        ## original functions are restored:
+        self.assertIs(vars(OrgFormat)['strdate'], original_strdate)
+        OrgFormat.strdate('2011-11-03 23:59')
+
+        snapshot = profiler.snapshot()
+        self.assertEqual(snapshot['strdate'].calls, 2)
+        self.assertEqual(snapshot['strdate'].failures, 1)
+        self.assertGreater(snapshot['strdate'].seconds, 0.0)
+        ## strdate() calls date() internally:
+        self.assertEqual(snapshot['date'].calls, 1)
+        self.assertEqual(snapshot['date'].failures, 0)
+        self.assertNotIn('link', snapshot)
+        self.assertEqual([call for call in calls if call[0] in ('date', 'strdate')],
+                         [('date', False), ('strdate', False), ('strdate', True)])
+
+        profiler.reset()
+        self.assertEqual(profiler.snapshot(), {})
+
+    def test_kept_wrappers(self):
+
+        ## wrappers kept beyond disable() stop measuring:
+        with OrgFormatProfiler() as profiler:
+            formatter = TimestampFormatter()
+            formatter.format(time.strptime('2011-11-03', '%Y-%m-%d'))
+        calls = profiler.snapshot()['weekday'].calls
+        self.assertEqual(formatter.format(time.strptime('2011-11-04', '%Y-%m-%d')), '<2011-11-04 Fri>')
+        self.assertEqual(profiler.snapshot()['weekday'].calls, calls)
+
+
+class TestHeadingRenderCache(unittest.TestCase):
+
+    def test_render(self):
+
+        cache = HeadingRenderCache(maxsize=2)
+        parameters = dict(level=1, keyword='TODO', priority='A', title='This is my title',
+                          tags=['foo', 'bar_baz'], scheduled_timestamp='<2019-12-29 Sun 11:35>',
+                          properties=[('ID', 'foo-123')], section='Some content.')
+        self.assertEqual(cache.render(**parameters), OrgFormat.generate_heading(**parameters))
+        self.assertEqual(cache.render(**parameters), OrgFormat.generate_heading(**parameters))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        ## positional parameters and PropertyDrawer result in the same key:
+        self.assertEqual(cache.render(1, 'TODO', 'A', 'This is my title', ['foo', 'bar_baz'],
+                                      '<2019-12-29 Sun 11:35>', None,
+                                      PropertyDrawer([('ID', 'foo-123')]), 'Some content.'),
+                         OrgFormat.generate_heading(**parameters))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+        ## least recently used headings are evicted:
+        cache.render(2, title='second')
+        cache.render(**parameters)
+        cache.render(3, title='third')
+        self.assertEqual(len(cache), 2)
+        cache.render(**parameters)
+        self.assertEqual((cache.hits, cache.misses), (4, 3))
+        cache.render(2, title='second')
+        self.assertEqual((cache.hits, cache.misses), (4, 4))
+
+        cache.clear()
+        self.assertEqual((len(cache), cache.hits, cache.misses), (0, 0, 0))
+
+    def test_max_characters(self):
+
+        cache = HeadingRenderCache(max_characters=20)
+        cache.render(1, title='a' * 10)
+        cache.render(1, title='b' * 10)
+        self.assertEqual(len(cache), 1)
+        cache.render(1, title='c' * 30)
+        self.assertEqual(len(cache), 0)
+
+    def test_fingerprint(self):
+
+        fingerprint = HeadingRenderCache.fingerprint(1, title='foo', properties=[('ID', '1')])
+        self.assertEqual(fingerprint, HeadingRenderCache.fingerprint(level=1, title='foo',
+                                                                     properties=PropertyDrawer([('ID', '1')])))
+        self.assertNotEqual(fingerprint, HeadingRenderCache.fingerprint(1, title='foo', properties=[('ID', '2')]))
+        self.assertNotEqual(fingerprint, HeadingRenderCache.fingerprint(1, title='foo'))
+        self.assertEqual(len(fingerprint), 32)
+        self.assertEqual(HeadingRenderCache.fingerprint(1, keyword='', priority='', title='foo', tags=[],
+                                                        scheduled_timestamp='', deadline_timestamp='',
+                                                        properties=PropertyDrawer([('ID', '1')]), section=''),
+                         fingerprint)
+        self.assertEqual(HeadingRenderCache.fingerprint(1, title='foo', section='bar\n'),
+                         HeadingRenderCache.fingerprint(1, title='foo', section='bar'))
+
+        cache = HeadingRenderCache()
+        new_fingerprint, text = cache.render_if_changed(None, 1, title='foo', properties=[('ID', '1')])
+        self.assertEqual(new_fingerprint, fingerprint)
+        self.assertEqual(text, '* foo\n:PROPERTIES:\n:ID: 1\n:END:\n')
+        self.assertEqual(cache.render_if_changed(fingerprint, 1, title='foo', properties=[('ID', '1')]),
+                         (fingerprint, None))
+
+
+class TestTimestampFormatter(unittest.TestCase):
+
+    def test_format(self):
+
+        struct_time = time.strptime('2011-11-02T20:38', '%Y-%m-%dT%H:%M')
+        date_time = datetime.datetime(2011, 11, 2, 20, 38)
+        for show_time in (False, True):
+            for inactive in (False, True):
+                for repeater in (None, '', ' ++1m ', '+2w'):
+                    formatter = TimestampFormatter(show_time=show_time, inactive=inactive, repeater=repeater)
+                    expected = OrgFormat.date(struct_time, show_time=show_time, inactive=inactive,
+                                              repeater_or_delay=repeater)
+                    self.assertEqual(formatter.format(struct_time), expected)
+                    self.assertEqual(formatter(date_time), expected)
+
+        ## wrong day of week within struct_time:
+        self.assertEqual(TimestampFormatter().format(time.struct_time([2013, 4, 3, 10, 54, 0, 0, 0, 0])),
+                         '<2013-04-03 Wed>')
+        self.assertEqual(TimestampFormatter(show_time=True, weekday_lang='de').format(date_time),
+                         '<2011-11-02 Mi 20:38>')
+        self.assertEqual(TimestampFormatter(repeater='+1d %').format(date_time), '<2011-11-02 Wed +1d %>')
+        with self.assertRaises(ValueError):
+            TimestampFormatter(weekday_lang='fr')
+
+    def test_pickle(self):
+
+        formatter = TimestampFormatter(show_time=True, inactive=True, repeater='+1w', weekday_lang='de')
+        unpickled = pickle.loads(pickle.dumps(formatter))
+        self.assertEqual(repr(unpickled), repr(formatter))
+        self.assertEqual(unpickled.format(datetime.datetime(2011, 11, 2, 20, 38)), '[2011-11-02 Mi 20:38 +1w]')
+
 
 # Local Variables:
 # End:
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# Find much more example calls in the unit test file patcher_test.py
+# -*- coding: utf-8; mode: python; -*-
+
+import os
+import shutil
+import tempfile
+from typing import Tuple, Optional, Union, Callable, NamedTuple  # mypy: type checks
+
+from orgformat.orgformat import PropertyDrawer, HEADING_BYTES_REGEX
+
+
+class Patch(NamedTuple):
+    """
+    A single edit of a file: bytes start to end get replaced.
+    """
+
+    start: int
+    end: int
+    replacement: bytes
+
+
+# the new entry or a function returning it for the current entry:
+NewEntry = Union[str, Callable[[str], str]]
+
+
+def entry_range(content: bytes,
+                heading_id: Optional[str] = None,
+                offset: Optional[int] = None,
+                encoding: str = 'utf-8') -> Tuple[int, int]:
+    """
+    Returns the byte range of an entry: its heading line, planning
+    line, property drawer and section up to the next heading of any
+    level. Sub-headings are not part of the entry.
+
+    entry_range(b'* foo\\n:PROPERTIES:\\n:ID: 1\\n:END:\\nbar\\n** baz\\n', heading_id='1')
+    -> (0, 36)
+
+    @param content: content of an Org mode file
+    @param heading_id: value of the :ID: or :CUSTOM_ID: property of the entry
+    @param offset: alternatively, the offset of the heading line as
+                   reported by PropertyDrawer.id_index_of_file()
+    @param encoding: encoding of the ID values
+    @param return: (start, end) byte offsets
+    @raise KeyError: if no heading has the given ID
+    @raise ValueError: if there is no heading line at offset
+    """
+
+    if heading_id is not None:
+        start = None
+        heading_offset = 0
+        for components in PropertyDrawer.ID_INDEX_BYTES_REGEX.finditer(content):
+            if components.group(1):
+                heading_offset = components.start()
+            elif components.group(3).decode(encoding) == heading_id:
+                start = heading_offset
+                break
+        if start is None or not HEADING_BYTES_REGEX.match(content, start):
+            raise KeyError(heading_id)
+    elif offset is not None:
+        start = offset
+        if not (start == 0 or content[start - 1:start] == b'\n') or \
+           not HEADING_BYTES_REGEX.match(content, start):
+            raise ValueError('there is no heading at offset ' + str(offset))
+    else:
+        raise ValueError('either heading_id or offset is required')
+
+    next_heading = HEADING_BYTES_REGEX.search(content, content.find(b'\n', start) + 1 or len(content))
+    return start, next_heading.start() if next_heading else len(content)
+
+
+def minimal_patch(old: bytes, new: bytes, base: int = 0) -> Optional[Patch]:
+    """
+    Returns the smallest single Patch turning old into new by skipping
+    their common prefix and suffix; None if both are equal.
+
+    minimal_patch(b'* foo\\n:ID: 1\\n', b'* foo\\n:ID: 2\\n')
+    -> Patch(start=11, end=12, replacement=b'2')
+
+    @param base: offset of old within the file; added to start and end
+    """
+
+    if old == new:
+        return None
+    shortest = min(len(old), len(new))
+    prefix = 0
+    while prefix < shortest and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < shortest - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return Patch(base + prefix, base + len(old) - suffix, new[prefix:len(new) - suffix])
+
+
+def _new_entry_bytes(content: bytes, start: int, end: int, new_entry: NewEntry, encoding: str) -> bytes:
+    """
+    Returns the encoded new entry, ending with a newline.
+
+    @raise ValueError: if the new entry does not start with a heading
+                       line or contains a further heading line
+    """
+
+    if callable(new_entry):
+        new_entry = new_entry(content[start:end].decode(encoding))
+    new_bytes = new_entry.encode(encoding)
+    if not HEADING_BYTES_REGEX.match(new_bytes):
+        raise ValueError('the new entry does not start with a heading line: ' + repr(new_entry[:40]))
+    if HEADING_BYTES_REGEX.search(new_bytes, 1):
+        raise ValueError('the new entry contains more than one heading line: ' + repr(new_entry[:40]))
+    if not new_bytes.endswith(b'\n'):
+        new_bytes += b'\n'
+    return new_bytes
+
+
+def patch_text(text: str,
+               new_entry: NewEntry,
+               heading_id: Optional[str] = None,
+               offset: Optional[int] = None) -> str:
+    """
+    Returns text with the entry given by heading_id or its character
+    offset replaced by new_entry. See patch_file().
+    """
+
+    content = text.encode('utf-8')
+    byte_offset = len(text[:offset].encode('utf-8')) if offset is not None else None
+    start, end = entry_range(content, heading_id, byte_offset)
+    patch = minimal_patch(content[start:end], _new_entry_bytes(content, start, end, new_entry, 'utf-8'), start)
+    if patch is None:
+        return text
+    return (content[:patch.start] + patch.replacement + content[patch.end:]).decode('utf-8')
+
+
+def patch_file(filename: str,
+               new_entry: NewEntry,
+               heading_id: Optional[str] = None,
+               offset: Optional[int] = None,
+               in_place: bool = False,
+               encoding: str = 'utf-8') -> Optional[Patch]:
+    """
+    Replaces one entry of an Org mode file, typically with the result
+    of OrgFormat.generate_heading(), by writing only what changed.
+
+    def add_property(entry):
+        drawer = PropertyDrawer.parse(entry)
+        drawer['SYNCED'] = OrgFormat.date(datetime.datetime.now(), show_time=True, inactive=True)
+        return OrgFormat.generate_heading(level=1, title='foo', properties=drawer)
+
+    patch_file('notes.org', add_property, heading_id='foo-123')
+
+    The file is not touched at all if the entry stays the same. By
+    default, the file gets replaced atomically by a temporary file in
+    the same directory. With in_place=True and an unchanged size, only
+    the changed bytes are written into the existing file which is not
+    atomic but keeps the inode and avoids rewriting the whole file;
+    if the size changes, the atomic replacement is used anyway.
+
+    The new entry has to be a single entry: it starts with a heading
+    line and contains no further one. A missing final newline gets
+    added so that the following heading stays on its own line.
+
+    @param filename: the Org mode file
+    @param new_entry: the new entry text or a function returning it for the current entry text
+    @param heading_id: value of the :ID: or :CUSTOM_ID: property of the entry
+    @param offset: alternatively, the byte offset of the heading line
+    @param in_place: write into the existing file if the size does not change
+    @param encoding: encoding of the file
+    @param return: the applied Patch or None if nothing changed
+    @raise ValueError: if new_entry is not a single entry
+    """
+
+    with open(filename, 'rb') as orgfile:
+        content = orgfile.read()
+    start, end = entry_range(content, heading_id, offset, encoding)
+    patch = minimal_patch(content[start:end], _new_entry_bytes(content, start, end, new_entry, encoding), start)
+    if patch is None:
+        return None
+
+    if in_place and len(patch.replacement) == patch.end - patch.start:
+        with open(filename, 'r+b') as orgfile:
+            orgfile.seek(patch.start)
+            orgfile.write(patch.replacement)
+            orgfile.flush()
+            os.fsync(orgfile.fileno())
+        return patch
+
+    directory, basename = os.path.split(os.path.abspath(filename))
+    descriptor, temporary_filename = tempfile.mkstemp(dir=directory, prefix='.' + basename + '.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as temporary_file:
+            temporary_file.write(memoryview(content)[:patch.start])
+            temporary_file.write(patch.replacement)
+            temporary_file.write(memoryview(content)[patch.end:])
+            temporary_file.flush()
+            os.fsync(temporary_file.fileno())
+        shutil.copymode(filename, temporary_filename)
+        os.replace(temporary_filename, filename)
+    except BaseException:
+        os.unlink(temporary_filename)
+        raise
+    return patch
+
+# Local Variables:
+# End:
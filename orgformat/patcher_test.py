@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import os
+import stat
+import tempfile
+from orgformat import OrgFormat, PropertyDrawer
+from orgformat.patcher import entry_range, minimal_patch, patch_text, patch_file, Patch
+
+
+class TestPatcher(unittest.TestCase):
+
+    FIRST = OrgFormat.generate_heading(level=1,
+                                       keyword='TODO',
+                                       title='This is my title',
+                                       properties=[('ID', 'foo-123'), ('COUNT', '1')],
+                                       section='Some content.')
+    CHILD = OrgFormat.generate_heading(level=2, title='child äöü', properties=[('ID', 'child')])
+    LAST = OrgFormat.generate_heading(level=1, title='last', properties=[('CUSTOM_ID', 'last')])
+    ORGTEXT = '#+TITLE: test\n' + FIRST + CHILD + LAST
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, 'test.org')
+        with open(self.filename, 'w', encoding='utf-8') as orgfile:
+            orgfile.write(self.ORGTEXT)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read(self):
+        with open(self.filename, encoding='utf-8') as orgfile:
+            return orgfile.read()
+
+    def test_entry_range(self):
+
+        content = self.ORGTEXT.encode('utf-8')
+        first_start = content.index(b'* TODO')
+        child_start = content.index(b'** child')
+        last_start = content.index(b'* last')
+        self.assertEqual(entry_range(content, heading_id='foo-123'), (first_start, child_start))
+        self.assertEqual(entry_range(content, heading_id='child'), (child_start, last_start))
+        self.assertEqual(entry_range(content, heading_id='last'), (last_start, len(content)))
+        self.assertEqual(entry_range(content, offset=child_start), (child_start, last_start))
+        with self.assertRaises(KeyError):
+            entry_range(content, heading_id='missing')
+        with self.assertRaises(ValueError):
+            entry_range(content, offset=first_start + 1)
+        with self.assertRaises(ValueError):
+            entry_range(content)
+        ## an ID before the first heading does not belong to an entry:
+        with self.assertRaises(KeyError):
+            entry_range(b':PROPERTIES:\n:ID: file\n:END:\n* foo\n', heading_id='file')
+
+    def test_minimal_patch(self):
+
+        self.assertEqual(minimal_patch(b'* foo\n:ID: 1\n', b'* foo\n:ID: 2\n'), Patch(11, 12, b'2'))
+        self.assertEqual(minimal_patch(b'abc', b'abc'), None)
+        self.assertEqual(minimal_patch(b'abc', b'abxc', 10), Patch(12, 12, b'x'))
+        self.assertEqual(minimal_patch(b'aaa', b'aa'), Patch(2, 3, b''))
+        self.assertEqual(minimal_patch(b'', b'new'), Patch(0, 0, b'new'))
+
+    def test_patch_text(self):
+
+        new_first = self.FIRST.replace(':COUNT: 1', ':COUNT: 2')
+        self.assertEqual(patch_text(self.ORGTEXT, new_first, heading_id='foo-123'),
+                         '#+TITLE: test\n' + new_first + self.CHILD + self.LAST)
+        self.assertEqual(patch_text(self.ORGTEXT, '** replaced\n', offset=self.ORGTEXT.index('** child')),
+                         '#+TITLE: test\n' + self.FIRST + '** replaced\n' + self.LAST)
+        self.assertEqual(patch_text(self.ORGTEXT, self.FIRST, heading_id='foo-123'), self.ORGTEXT)
+
+        ## the next heading stays on its own line:
+        self.assertEqual(patch_text('* a\n:PROPERTIES:\n:ID: x\n:END:\n* b\n', '* a2', heading_id='x'),
+                         '* a2\n* b\n')
+        ## only single entries are written:
+        for invalid in ['not a heading\n', '', ' * indented\n', '* a\n** sub-heading\n']:
+            with self.assertRaises(ValueError):
+                patch_text(self.ORGTEXT, invalid, heading_id='foo-123')
+
+    def test_patch_file(self):
+
+        def increment(entry):
+            drawer = PropertyDrawer.parse(entry)
+            drawer['COUNT'] = str(int(drawer['COUNT']) + 1)
+            return OrgFormat.generate_heading(level=1, keyword='TODO', title='This is my title',
+                                              properties=drawer, section='Some content.')
+
+        os.chmod(self.filename, 0o640)
+        inode = os.stat(self.filename).st_ino
+        patch = patch_file(self.filename, increment, heading_id='foo-123')
+        self.assertEqual(patch.replacement, b'2')
+        self.assertEqual(self.read(), '#+TITLE: test\n' + self.FIRST.replace(':COUNT: 1', ':COUNT: 2') +
+                         self.CHILD + self.LAST)
+        ## atomically replaced with the same permissions and no temporary files left:
+        self.assertNotEqual(os.stat(self.filename).st_ino, inode)
+        self.assertEqual(stat.S_IMODE(os.stat(self.filename).st_mode), 0o640)
+        self.assertEqual(os.listdir(self.tmpdir.name), ['test.org'])
+
+        ## same size, in place:
+        inode = os.stat(self.filename).st_ino
+        patch_file(self.filename, increment, heading_id='foo-123', in_place=True)
+        self.assertEqual(os.stat(self.filename).st_ino, inode)
+        self.assertIn(':COUNT: 3\n', self.read())
+
+        ## size changes, in_place falls back to the atomic replacement:
+        content = self.read()
+        patch = patch_file(self.filename, self.CHILD.replace('** child', '** renamed child'), heading_id='child',
+                           in_place=True)
+        self.assertEqual(patch.replacement, b'renamed ')
+        self.assertEqual(self.read(), content.replace('** child', '** renamed child'))
+
+        ## unchanged entries do not touch the file:
+        mtime = os.stat(self.filename).st_mtime_ns
+        self.assertIsNone(patch_file(self.filename, self.LAST, heading_id='last'))
+        self.assertEqual(os.stat(self.filename).st_mtime_ns, mtime)
+
+        ## neither do invalid entries:
+        with self.assertRaises(ValueError):
+            patch_file(self.filename, 'not a heading\n', heading_id='last')
+        self.assertEqual(os.stat(self.filename).st_mtime_ns, mtime)
+        self.assertEqual(os.listdir(self.tmpdir.name), ['test.org'])
+
+
+# Local Variables:
+# End:
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# Find much more example calls in the unit test file scanner_test.py
+# -*- coding: utf-8; mode: python; -*-
+
+import collections
+import concurrent.futures
+import os
+import re
+import threading
+from typing import List, Tuple, Optional, Iterator, NamedTuple  # mypy: type checks
+
+from orgformat.orgformat import OrgFormat, PropertyDrawer, HEADING_REGEX
+
+# a property drawer only counts right after the heading line or its
+# planning line, as in Org mode; matched at the end of the heading line:
+PROPERTY_DRAWER_START_REGEX = re.compile(r'\n(?:[ \t]*(?:SCHEDULED|DEADLINE|CLOSED):[^\n]*\n)?' +
+                                         r'[ \t]*:PROPERTIES:[ \t]*$', re.MULTILINE)
+
+# unlike OrgFormat.ORGMODE_TIMESTAMP_REGEX, time-stamps may be anywhere within the text:
+TIMESTAMP_REGEX = re.compile(OrgFormat.SINGLE_ORGMODE_TIMESTAMP)
+
+
+class ScannedHeading(NamedTuple):
+    offset: int  # character offset of the heading line
+    level: int
+    title: str  # the heading line without the asterisks
+    properties: List[Tuple[str, str]]  # content of the property drawer
+
+
+class ScannedFile(NamedTuple):
+    filename: str
+    headings: List[ScannedHeading]
+    timestamps: List[Tuple[int, str]]  # character offset and time-stamp
+
+
+def scan_text(text: str, filename: str = '') -> ScannedFile:
+    """
+    Returns the headings with their property drawers and all time-stamps
+    of Org mode text.
+
+    scan_text('* foo\\n:PROPERTIES:\\n:ID: 123\\n:END:\\n<2019-12-29 Sun>\\n')
+    -> ScannedFile(filename='', headings=[ScannedHeading(offset=0, level=1, title='foo',
+                   properties=[('ID', '123')])], timestamps=[(35, '<2019-12-29 Sun>')])
+
+    Time-stamps are the ones OrgFormat.SINGLE_ORGMODE_TIMESTAMP matches.
+    As in Org mode, only a property drawer right after the heading line
+    or its planning line belongs to the heading. Malformed property
+    drawers are skipped.
+
+    @param text: content of an Org mode file
+    @param filename: name reported in the result
+    @param return: ScannedFile
+    """
+
+    headings: List[ScannedHeading] = []
+    matches = list(HEADING_REGEX.finditer(text))
+    for index, heading in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        properties: List[Tuple[str, str]] = []
+        drawer_start = PROPERTY_DRAWER_START_REGEX.match(text, heading.end(), end)
+        if drawer_start:
+            try:
+                properties = PropertyDrawer.parse(text[drawer_start.start():end]).items()
+            except ValueError:
+                pass
+        headings.append(ScannedHeading(heading.start(), len(heading.group(1)), heading.group(2), properties))
+
+    timestamps = [(timestamp.start(), timestamp.group(0)) for timestamp in TIMESTAMP_REGEX.finditer(text)]
+    return ScannedFile(filename, headings, timestamps)
+
+
+def scan_file(filename: str, encoding: str = 'utf-8') -> ScannedFile:
+    """
+    Returns scan_text() of the content of the given file. Characters
+    which can not be decoded are replaced.
+    """
+
+    with open(filename, encoding=encoding, errors='replace') as orgfile:
+        return scan_text(orgfile.read(), filename)
+
+
+def find_files(directory: str, suffix: str = '.org') -> List[str]:
+    """
+    Returns the sorted paths of all files below directory ending with suffix.
+    """
+
+    result = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.endswith(suffix):
+                result.append(os.path.join(dirpath, filename))
+    return sorted(result)
+
+
+def scan_directory(directory: str,
+                   suffix: str = '.org',
+                   max_workers: Optional[int] = None,
+                   use_threads: bool = False,
+                   cancel: Optional[threading.Event] = None,
+                   encoding: str = 'utf-8') -> Iterator[ScannedFile]:
+    """
+    Scans all Org mode files below directory in parallel and yields
+    their ScannedFile results sorted by file name.
+
+    for scanned_file in scan_directory('~/org', max_workers=8):
+        print(scanned_file.filename, len(scanned_file.headings))
+
+    Only a limited number of files is in flight at any time so that
+    results are streamed instead of being collected first. Setting
+    the cancel event or closing the generator stops the scan: files
+    not yet started are dropped and the workers are shut down.
+
+    @param directory: root directory of the Org mode files
+    @param suffix: file name suffix of the files to scan
+    @param max_workers: number of worker processes (threads); default is the number of CPUs
+    @param use_threads: if True, use a thread pool instead of a process pool
+    @param cancel: optional event to stop the scan from another thread
+    @param encoding: encoding of the files
+    @param return: iterator of ScannedFile in file name order
+    """
+
+    filenames = iter(find_files(directory, suffix))
+    executor: concurrent.futures.Executor
+    if use_threads:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers)
+    window = 4 * (max_workers or os.cpu_count() or 1)
+    pending: 'collections.deque[concurrent.futures.Future[ScannedFile]]' = collections.deque()
+    try:
+        for filename in filenames:
+            pending.append(executor.submit(scan_file, filename, encoding))
+            if len(pending) >= window:
+                break
+        while pending:
+            if cancel is not None and cancel.is_set():
+                return
+            result = pending.popleft().result()
+            for filename in filenames:
+                pending.append(executor.submit(scan_file, filename, encoding))
+                break
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+# Local Variables:
+# End:
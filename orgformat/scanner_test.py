@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import os
+import tempfile
+import threading
+from orgformat import OrgFormat
+from orgformat.scanner import scan_text, scan_file, scan_directory, find_files, ScannedHeading
+
+
+class TestScanner(unittest.TestCase):
+
+    ORGTEXT = OrgFormat.generate_heading(level=1,
+                                         keyword='TODO',
+                                         title='This is my title',
+                                         scheduled_timestamp='<2019-12-29 Sun 11:35>',
+                                         properties=[('ID', 'foo-123'), ('CREATED', '[2011-11-03 Thu 23:59]')],
+                                         section='Some content.') + \
+        OrgFormat.generate_heading(level=2, title='second', section='no properties [2020-01-01 Wed]')
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        for index in range(10):
+            subdir = os.path.join(self.tmpdir.name, 'sub' if index % 2 else '')
+            os.makedirs(subdir, exist_ok=True)
+            with open(os.path.join(subdir, 'file%d.org' % index), 'w', encoding='utf-8') as orgfile:
+                orgfile.write(self.ORGTEXT + OrgFormat.generate_heading(level=1, title=str(index)))
+        with open(os.path.join(self.tmpdir.name, 'ignored.txt'), 'w') as otherfile:
+            otherfile.write('* no Org file\n')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_scan_text(self):
+
+        scanned = scan_text(self.ORGTEXT, 'test.org')
+        self.assertEqual(scanned.filename, 'test.org')
+        self.assertEqual(scanned.headings,
+                         [ScannedHeading(0, 1, 'TODO This is my title',
+                                         [('ID', 'foo-123'), ('CREATED', '[2011-11-03 Thu 23:59]')]),
+                          ScannedHeading(self.ORGTEXT.index('** second'), 2, 'second', [])])
+        self.assertEqual(scanned.timestamps,
+                         [(self.ORGTEXT.index('<2019'), '<2019-12-29 Sun 11:35>'),
+                          (self.ORGTEXT.index('[2011'), '[2011-11-03 Thu 23:59]'),
+                          (self.ORGTEXT.index('[2020'), '[2020-01-01 Wed]')])
+
+        ## only a drawer after the heading or its planning line counts:
+        self.assertEqual([heading.properties for heading in scan_text(
+            '* a\nSCHEDULED: <2019-12-29 Sun>\n:PROPERTIES:\n:ID: 1\n:END:\n' +
+            '* b\ntext\n:PROPERTIES:\n:ID: 2\n:END:\n' +
+            '* c\n#+BEGIN_EXAMPLE\n:PROPERTIES:\n:ID: 3\n:END:\n#+END_EXAMPLE\n').headings],
+            [[('ID', '1')], [], []])
+
+        ## a broken drawer does not stop the scan:
+        self.assertEqual(scan_text('* foo\n:PROPERTIES:\n:ID: 1\n* bar\n').headings,
+                         [ScannedHeading(0, 1, 'foo', []), ScannedHeading(26, 1, 'bar', [])])
+
+    def test_scan_file(self):
+
+        filename = os.path.join(self.tmpdir.name, 'file0.org')
+        self.assertEqual(scan_file(filename).headings[-1].title, '0')
+
+    def test_scan_directory(self):
+
+        filenames = find_files(self.tmpdir.name)
+        self.assertEqual(len(filenames), 10)
+        self.assertEqual(filenames, sorted(filenames))
+
+        for use_threads in (True, False):
+            results = list(scan_directory(self.tmpdir.name, max_workers=2, use_threads=use_threads))
+            self.assertEqual([result.filename for result in results], filenames)
+            self.assertEqual([result.headings[-1].title for result in results],
+                             [os.path.basename(filename)[4:-4] for filename in filenames])
+
+    def test_cancel(self):
+
+        cancel = threading.Event()
+        results = []
+        for result in scan_directory(self.tmpdir.name, max_workers=2, use_threads=True, cancel=cancel):
+            results.append(result)
+            cancel.set()
+        self.assertEqual(len(results), 1)
+
+        ## closing the generator early shuts the pool down as well:
+        scanning = scan_directory(self.tmpdir.name, max_workers=2)
+        next(scanning)
+        scanning.close()
+
+
+# Local Variables:
+# End:
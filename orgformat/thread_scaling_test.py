@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Multi-threaded scaling benchmark: the same parsing workload runs on
+# 1, 2, 4, ... threads and the throughput per thread count is written
+# to the given report file. The results of all threads are compared
+# with the single-threaded results.
+#
+# On free-threaded (no-GIL) CPython builds the throughput is expected
+# to grow nearly linearly with the number of threads up to the number
+# of CPUs. Set ORGFORMAT_THREAD_SCALING_EFFICIENCY to assert that, e.g.
+# 0.7 for at least 70% of linear scaling:
+#
+#   ORGFORMAT_THREAD_SCALING_ITERATIONS=200000 ORGFORMAT_THREAD_SCALING_EFFICIENCY=0.7 \
+#       ORGFORMAT_THREAD_SCALING_REPORT=bench_output.txt PYTHONPATH=. python3.13t -m pytest orgformat/thread_scaling_test.py
+
+import unittest
+import concurrent.futures
+import os
+import random
+import sys
+import time
+from orgformat import OrgFormat, TimestampParseException
+
+ITERATIONS = int(os.environ.get('ORGFORMAT_THREAD_SCALING_ITERATIONS', '2000'))
+MAX_THREADS = int(os.environ.get('ORGFORMAT_THREAD_SCALING_MAX_THREADS', str(os.cpu_count() or 1)))
+EFFICIENCY = os.environ.get('ORGFORMAT_THREAD_SCALING_EFFICIENCY')
+REPORT = os.environ.get('ORGFORMAT_THREAD_SCALING_REPORT')
+
+
+def workload(seed):
+    """
+    Returns the inputs of one thread: a mix of the formats the parsers accept.
+    """
+
+    rng = random.Random(seed)
+    inputs = []
+    for _ in range(ITERATIONS):
+        year, month, day = rng.randint(1900, 2100), rng.randint(1, 12), rng.randint(1, 28)
+        hour, minute, second = rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59)
+        inputs.append((OrgFormat.parse_extended_iso_datetime,
+                       '%04d-%d-%d %02d:%02d:%02d' % (year, month, day, hour, minute, second)))
+        inputs.append((OrgFormat.parse_basic_iso_datetime,
+                       '%04d%02d%02dT%02d%02d%02d' % (year, month, day, hour, minute, second)))
+        inputs.append((OrgFormat.strdate, '%04d-%02d-%02d' % (year, month, day)))
+        inputs.append((OrgFormat.orgmode_timestamp_to_datetime,
+                       '<%04d-%02d-%02d Mon %02d:%02d>' % (year, month, day, hour, minute)))
+    return inputs
+
+
+def run(inputs):
+    results = []
+    for function, argument in inputs:
+        try:
+            results.append(function(argument))
+        except (TimestampParseException, ValueError) as e:
+            results.append(type(e))
+    return results
+
+
+class TestThreadScaling(unittest.TestCase):
+
+    def test_thread_scaling(self):
+
+        thread_counts = [1]
+        while thread_counts[-1] * 2 <= MAX_THREADS:
+            thread_counts.append(thread_counts[-1] * 2)
+        workloads = [workload(seed) for seed in range(thread_counts[-1])]
+        expected = [run(inputs) for inputs in workloads]
+
+        throughput = {}
+        for threads in thread_counts:
+            with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+                start = time.perf_counter()
+                results = list(executor.map(run, workloads[:threads]))
+                duration = time.perf_counter() - start
+            self.assertEqual(results, expected[:threads])
+            throughput[threads] = sum(len(inputs) for inputs in workloads[:threads]) / duration
+
+        gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+        if REPORT:
+            with open(REPORT, 'a') as report:
+                report.write('thread scaling: %d inputs per thread, GIL %s, %d CPUs\n' %
+                             (len(workloads[0]), 'enabled' if gil_enabled else 'disabled', os.cpu_count() or 1))
+                for threads, calls_per_second in throughput.items():
+                    report.write('  %3d threads %12.0f calls/s %6.2fx\n' %
+                                 (threads, calls_per_second, calls_per_second / throughput[1]))
+
+        if EFFICIENCY and not gil_enabled:
+            for threads, calls_per_second in throughput.items():
+                self.assertGreaterEqual(calls_per_second / throughput[1], float(EFFICIENCY) * threads,
+                                        'throughput of %d threads' % threads)
+
+
+# Local Variables:
+# End:
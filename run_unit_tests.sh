@@ -2,10 +2,10 @@
 set -o errexit
 
 # pytest is invoking the unit tests:
-PYTHONPATH=. uv run --with pytest pytest orgformat/orgformat_test.py
+PYTHONPATH=. uv run --with pytest pytest orgformat/*_test.py
 
 # mypy is checking the type annotations:
-PYTHONPATH=. uv run --with mypy mypy orgformat/orgformat.py
+PYTHONPATH=. uv run --with mypy mypy orgformat/orgformat.py orgformat/agenda.py orgformat/scanner.py orgformat/patcher.py orgformat/export.py
 
 # OK, this is not a unit test but this doesn't take long and updated docu is always good:
 ./update_pydoc.sh